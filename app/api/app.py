@@ -2,14 +2,15 @@
 Flask API for Autism Pre-Screening Tool
 """
 
-from flask import Flask, request, jsonify
-import json
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from datetime import datetime
 import os
 from flask_cors import CORS
 import sys
 from pathlib import Path
 import traceback
+import threading
+import signal
 import os
 from dotenv import load_dotenv
 
@@ -29,33 +30,146 @@ print(f"[Flask] Project root: {PROJECT_ROOT}")
 sys.path.insert(0, str(PROJECT_ROOT))
 sys.path.insert(0, str(PROJECT_ROOT / "src"))
 
-# Also add the nested project folder for backward compatibility
+# Also add the nested project folder for backward compatibility.
+# Appended (not prepended) so that `src.*` resolves to the root backend modules first.
 nested_project = PROJECT_ROOT / "autism-prescreening-tool"
 if nested_project.exists():
-    sys.path.insert(0, str(nested_project))
-    sys.path.insert(0, str(nested_project / "src"))
+    sys.path.append(str(nested_project))
+    sys.path.append(str(nested_project / "src"))
 
 print(f"[Flask] Python path: {sys.path[:4]}")
 
 # Import after path is set
 try:
-    from src.inference import predict_autism_risk
-    from src.llm_report_groq import generate_risk_report
-    # Import the root `src/pdf_generator.py` explicitly to avoid ambiguous nested imports
-    import importlib.util
-    pdf_mod_path = PROJECT_ROOT / "src" / "pdf_generator.py"
-    spec = importlib.util.spec_from_file_location("root_pdf_generator", str(pdf_mod_path))
-    pdf_mod = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(pdf_mod)
-    generate_pdf_report = getattr(pdf_mod, "generate_pdf_report")
-    print("[Flask] ✓ All modules imported successfully (pdf_generator loaded from root src)")
+    from src.inference import (
+        predict_autism_risk, predict_autism_risk_batch, init_predictor, readiness,
+        model_version, start_model_watcher
+    )
+    from src.log_writer import get_log_writer
+    from src.api_common import (
+        QCHAT_QUESTIONS, validate_predict_payload, batch_records, validate_batch,
+        SSE_HEADERS, sse_event, report_link, valid_report_link, resolve_screening,
+        is_admin_request, wants_async, screening_report, screening_pdf, resolve_job_request,
+        register_jobs, submit_job, job_status, admin_reload_model, admin_model_status,
+        admin_model_registry, admin_llm_status
+    )
+    from src.result_store import get_result_store
+    from src.jobs import get_job_queue, JobQueueFull
+    from src.llm_report_groq import generate_risk_report, stream_risk_report
+    # The root src/ is first on sys.path, so this is the ReportLab generator (not the nested text-only one)
+    from src.pdf_generator import generate_pdf_report, generate_pdf_bytes, get_pdf_generator, report_content_type
+    from src.pdf_pool import enable_pdf_pool, PDFPoolFull
+    from src.artifact_store import get_artifact_store
+    from src.retention import get_retention_manager
+    print("[Flask] ✓ All modules imported successfully")
 except Exception as e:
     print(f"[Flask] ❌ Import failed: {e}")
     traceback.print_exc()
     raise
 
 app = Flask(__name__)
-CORS(app, origins="*", methods=["GET", "POST"], allow_headers=["Content-Type"])
+CORS(app, origins="*", methods=["GET", "POST"], allow_headers=["Content-Type"], expose_headers=["X-Model-Version"])
+
+# Upper bound on records accepted by /api/predict/batch in one request
+PREDICT_BATCH_MAX = int(os.getenv("PREDICT_BATCH_MAX", "5000"))
+
+# "background" loads and warms the model in a thread at startup (/ready reports when done),
+# "sync" does it before the app starts serving
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "background").lower()
+
+# Request/result logs are written by background writers (see src/log_writer.py)
+LOGS_DIR = PROJECT_ROOT / "logs"
+predict_log = get_log_writer(LOGS_DIR / "predict_requests.log")
+pdf_log = get_log_writer(LOGS_DIR / "pdf_requests.log")
+
+# /api/generate-pdf renders in memory and answers with the bytes; "async" (default) also writes the
+# file to reports/ in the background, "sync" writes it before answering, "off" never writes it
+PDF_PERSIST = os.getenv("PDF_PERSIST", "async").lower()
+
+# Render PDFs in worker processes (PDF_POOL_WORKERS) instead of request threads
+enable_pdf_pool()
+
+# Precompute artifacts for every new screening while the parent reads the result:
+# "report" generates the report, "pdf" the report and the PDF ("off" by default)
+SPECULATIVE_ARTIFACTS = os.getenv("SPECULATIVE_ARTIFACTS", "off").lower()
+
+# Set by app/api/gunicorn.conf.py: the app is imported in the pre-fork master, so
+# background threads must be started in each worker (post_fork) instead of here
+PREFORK_SERVER = os.getenv("PREFORK_SERVER") == "1"
+
+
+def _load_and_warm_up_model():
+    try:
+        init_predictor()
+        print("[Flask] ✓ Model loaded and warmed up")
+    except Exception as e:
+        print(f"[Flask] ❌ Model warm-up failed: {e}")
+        traceback.print_exc()
+    if not PREFORK_SERVER:
+        start_background_services()
+
+
+def start_background_services():
+    """Start per-process background threads (threads do not survive fork)"""
+    start_model_watcher()
+    get_job_queue().start()
+    get_retention_manager().start_sweeper()
+
+
+def _persist_pdf(filename, pdf_data, screening_id, store, replace=False):
+    """Write an in-memory render to reports/ according to PDF_PERSIST and record it on the screening"""
+    def saved(path):
+        if not screening_id:
+            return
+        if replace:
+            store.update(screening_id, pdf_path=str(path))  # replaces a file that was removed
+        else:
+            store.setdefault(screening_id, "pdf_path", str(path))
+
+    if PDF_PERSIST == "async":
+        get_pdf_generator().save_async(filename, pdf_data, on_saved=saved)
+    elif PDF_PERSIST == "sync":
+        saved(get_pdf_generator().save(filename, pdf_data))
+
+
+def _speculative_job(params):
+    """Background job: precompute the report (and PDF) of a new screening before it is asked for"""
+    screening_id, record, store = resolve_job_request(params)
+    if SPECULATIVE_ARTIFACTS == "pdf":
+        screening_pdf(screening_id, record, store)
+    else:
+        screening_report(screening_id, record, store)
+    return {"screening_id": screening_id}
+
+
+jobs = register_jobs(get_job_queue())
+# Own small pool so speculation never delays requested work; not persisted (cheap to lose)
+jobs.register("speculative", _speculative_job, workers=2, persist=False)
+
+
+def _speculate(screening_id):
+    if SPECULATIVE_ARTIFACTS not in ("report", "pdf"):
+        return
+    try:
+        jobs.submit("speculative", {"screening_id": screening_id})
+    except JobQueueFull:
+        pass  # busy: the artifacts are produced on request instead
+
+
+if __name__ == "__mp_main__":
+    pass  # re-imported in a spawned PDF render process (python app.py): serve nothing there
+elif MODEL_LOAD_MODE == "sync":
+    _load_and_warm_up_model()
+else:
+    threading.Thread(target=_load_and_warm_up_model, name="model-warmup", daemon=True).start()
+
+
+@app.after_request
+def add_model_version_header(response):
+    version = model_version()
+    if version:
+        response.headers["X-Model-Version"] = version
+    return response
 
 
 @app.route("/health", methods=["GET"])
@@ -67,6 +181,54 @@ def health():
     }), 200
 
 
+@app.route("/ready", methods=["GET"])
+def ready():
+    """Readiness: 200 only once the model is loaded and warmed up"""
+    state = readiness()
+    return jsonify(state), (200 if state["ready"] else 503)
+
+
+def _restart_workers(swap):
+    if PREFORK_SERVER:
+        # Only this worker has swapped: HUP makes the gunicorn master reload its copy
+        # (on_reload) and replace every worker with one forked from it
+        os.kill(os.getppid(), signal.SIGHUP)
+        swap["workers"] = "restarting"
+
+
+@app.route("/api/admin/reload-model", methods=["POST"])
+def api_reload_model():
+    """Load new model artifacts, canary-check them and swap them in without a restart"""
+    if not is_admin_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    body, status = admin_reload_model(on_reloaded=_restart_workers)
+    return jsonify(body), status
+
+
+@app.route("/api/admin/model", methods=["GET"])
+def api_model_status():
+    """Serving model version, reload history and prediction cache counters"""
+    if not is_admin_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(admin_model_status()), 200
+
+
+@app.route("/api/admin/models", methods=["GET"])
+def api_model_registry():
+    """Primary vs shadow model outputs and latencies"""
+    if not is_admin_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(admin_model_registry()), 200
+
+
+@app.route("/api/admin/llm", methods=["GET"])
+def api_llm_status():
+    """LLM client, report cache, result store, single-flight, PDF pool, artifact store and retention stats"""
+    if not is_admin_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(admin_llm_status()), 200
+
+
 @app.route("/api/predict", methods=["POST"])
 def api_predict():
     """Predict autism risk"""
@@ -75,54 +237,34 @@ def api_predict():
         print(f"\n[API] POST /api/predict")
         print(f"[API] Received: {data}")
 
-        # Write incoming request to log for debugging frontend payloads
+        # Log incoming request for debugging frontend payloads
         try:
-            logs_dir = PROJECT_ROOT / "logs"
-            os.makedirs(str(logs_dir), exist_ok=True)
-            log_path = logs_dir / "predict_requests.log"
-            with open(str(log_path), "a", encoding="utf-8") as lf:
-                lf.write(json.dumps({
-                    "ts": datetime.utcnow().isoformat() + "Z",
-                    "remote": request.remote_addr,
-                    "payload": data
-                }, ensure_ascii=False) + "\n")
+            predict_log.write({
+                "ts": datetime.utcnow().isoformat() + "Z",
+                "remote": request.remote_addr,
+                "payload": data
+            })
         except Exception as _logerr:
             print(f"[API] Warning: failed to write predict log: {_logerr}")
         
-        if not data:
-            return jsonify({"error": "No JSON data provided"}), 400
-        
-        # Validate all required fields
-        required = ["age_mons", "gender", "jaundice", "family_mem_with_asd", "qchat_answers"]
-        missing = [f for f in required if f not in data]
-        if missing:
-            return jsonify({"error": f"Missing fields: {missing}"}), 400
-        
-        # Validate qchat_answers has 10 entries
-        qchat = data.get("qchat_answers", {})
-        if len(qchat) != 10:
-            return jsonify({
-                "error": f"Expected 10 Q-CHAT answers, got {len(qchat)}"
-            }), 400
+        error = validate_predict_payload(data)
+        if error:
+            return jsonify({"error": error}), 400
         
-        # Convert to correct format
-        if isinstance(list(qchat.keys())[0], str):
-            qchat_int = {int(k): v for k, v in qchat.items()}
-            data["qchat_answers"] = qchat_int
-        
-        # Run prediction
+        # Run prediction and keep it server-side so report/PDF calls can refer to it by ID
         result = predict_autism_risk(data)
+        result = {**result, "screening_id": get_result_store().create(result)}
+        _speculate(result["screening_id"])
         print(f"[API] ✓ Prediction successful\n")
 
         # Log result for debugging
         try:
-            with open(str(PROJECT_ROOT / "logs" / "predict_requests.log"), "a", encoding="utf-8") as lf:
-                lf.write(json.dumps({
-                    "ts": datetime.utcnow().isoformat() + "Z",
-                    "remote": request.remote_addr,
-                    "payload": data,
-                    "result": result
-                }, ensure_ascii=False) + "\n")
+            predict_log.write({
+                "ts": datetime.utcnow().isoformat() + "Z",
+                "remote": request.remote_addr,
+                "payload": data,
+                "result": result
+            })
         except Exception as _logerr:
             print(f"[API] Warning: failed to write prediction result to log: {_logerr}")
         
@@ -134,27 +276,66 @@ def api_predict():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/predict/batch", methods=["POST"])
+def api_predict_batch():
+    """Predict autism risk for many screenings in one request"""
+    try:
+        records = batch_records(request.get_json(silent=True))
+        print(f"\n[API] POST /api/predict/batch")
+        
+        error, details = validate_batch(records, PREDICT_BATCH_MAX)
+        if error:
+            body = {"error": error}
+            if details:
+                body["details"] = details
+            return jsonify(body), 400
+        
+        results = predict_autism_risk_batch(records)
+        print(f"[API] ✓ Batch prediction successful ({len(results)} records)\n")
+        
+        return jsonify({"count": len(results), "results": results}), 200
+        
+    except Exception as e:
+        print(f"[API] ❌ Batch error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+def _submit_job(kind, data):
+    body, status, headers = submit_job(kind, data)
+    return jsonify(body), status, headers
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id):
+    """Status of a report/PDF job: queued, running, succeeded (with result) or failed (with error)"""
+    body, status = job_status(job_id)
+    return jsonify(body), status
+
+
 @app.route("/api/generate-report", methods=["POST"])
 def api_generate_report():
-    """Generate detailed report from prediction result"""
+    """Generate detailed report from prediction result (or a stored screening_id)"""
     try:
         data = request.get_json()
         print(f"\n[API] POST /api/generate-report")
         print(f"[API] Received: {data}")
         
-        if not data or "prediction_result" not in data:
-            return jsonify({"error": "Missing prediction_result"}), 400
+        store = get_result_store()
+        screening_id, record, error, status = resolve_screening(data, store)
+        if error:
+            return jsonify({"error": error}), status
         
-        prediction_result = data["prediction_result"]
-        print(f"[API] Generating report for result: {prediction_result}")
+        if wants_async(request.args, request.headers):
+            return _submit_job("report", data)
         
-        report_text = generate_risk_report(prediction_result)
+        report_text = screening_report(screening_id, record, store)
         print(f"[API] ✓ Report generated successfully")
         
-        return jsonify({
-            "status": "success",
-            "report": report_text
-        }), 200
+        body = {"status": "success", "report": report_text}
+        if screening_id:
+            body["screening_id"] = screening_id
+        return jsonify(body), 200
         
     except Exception as e:
         print(f"[API] ❌ Report generation error: {e}")
@@ -162,82 +343,174 @@ def api_generate_report():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/generate-report/stream", methods=["POST"])
+def api_generate_report_stream():
+    """Stream the report as server-sent events while the LLM writes it"""
+    data = request.get_json(silent=True)
+    print(f"\n[API] POST /api/generate-report/stream")
+
+    store = get_result_store()
+    screening_id, record, error, status = resolve_screening(data, store)
+    if error:
+        return jsonify({"error": error}), status
+
+    def events():
+        try:
+            stored = record.get("report") if screening_id else None
+            if stored is not None:
+                yield sse_event("token", {"text": stored})
+            else:
+                parts = []
+                for text in stream_risk_report(record["prediction_result"]):
+                    parts.append(text)
+                    yield sse_event("token", {"text": text})
+                if screening_id:
+                    store.setdefault(screening_id, "report", "".join(parts))
+            yield sse_event("done", {"screening_id": screening_id})
+            print(f"[API] ✓ Report streamed")
+        except Exception as e:
+            print(f"[API] ❌ Report streaming error: {e}")
+            traceback.print_exc()
+            yield sse_event("error", {"error": str(e)})
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+
 @app.route("/api/generate-pdf", methods=["POST"])
 def api_generate_pdf():
     """Generate PDF report"""
     try:
         data = request.get_json()
         
-        if not data or "prediction_result" not in data or "report_text" not in data:
+        store = get_result_store()
+        screening_id, record, error, status = resolve_screening(data, store)
+        if error:
+            return jsonify({"error": error}), status
+        if not screening_id and record["report"] is None:
             return jsonify({"error": "Missing prediction_result or report_text"}), 400
 
         # Log incoming PDF generation request
         try:
-            logs_dir = PROJECT_ROOT / "logs"
-            os.makedirs(str(logs_dir), exist_ok=True)
-            pdf_log = logs_dir / "pdf_requests.log"
-            with open(str(pdf_log), "a", encoding="utf-8") as pf:
-                pf.write(json.dumps({
-                    "ts": datetime.utcnow().isoformat() + "Z",
-                    "remote": request.remote_addr,
-                    "payload_summary": {
-                        "has_prediction": "prediction_result" in data,
-                        "report_length": len(str(data.get("report_text", "")))
-                    }
-                }, ensure_ascii=False) + "\n")
+            pdf_log.write({
+                "ts": datetime.utcnow().isoformat() + "Z",
+                "remote": request.remote_addr,
+                "payload_summary": {
+                    "screening_id": screening_id,
+                    "has_prediction": "prediction_result" in data,
+                    "report_length": len(str(data.get("report_text", "")))
+                }
+            })
         except Exception as _e:
             print(f"[API] Warning: failed to write pdf request log: {_e}")
 
-        result = data["prediction_result"]
-        report_text = data["report_text"]
-
-        pdf_path = generate_pdf_report(result, report_text)
+        if wants_async(request.args, request.headers):
+            return _submit_job("pdf", data)
 
-        # Verify file exists and size
-        try:
-            if not pdf_path or not Path(str(pdf_path)).exists():
-                return jsonify({"error": "PDF generation failed - file not created"}), 500
-            file_size = Path(str(pdf_path)).stat().st_size
-            # Log file path and size
-            with open(str(pdf_log), "a", encoding="utf-8") as pf:
-                pf.write(json.dumps({
-                    "ts": datetime.utcnow().isoformat() + "Z",
-                    "pdf_path": str(pdf_path),
-                    "size": file_size
-                }, ensure_ascii=False) + "\n")
-
-        except Exception as _e:
-            print(f"[API] Warning: failed to verify/write pdf log: {_e}")
+        # A stored screening renders its PDF once; repeated downloads reuse the file
+        stored_path = record.get("pdf_path") if screening_id else None
+        pdf_data = None
+        if stored_path and get_artifact_store().touch(stored_path):
+            try:
+                with open(stored_path, "rb") as f:
+                    pdf_data = f.read()
+                filename = Path(stored_path).name
+            except FileNotFoundError:
+                pass  # removed by the retention sweeper since the touch: render it again
+        if pdf_data is None:
+            report_text = screening_report(screening_id, record, store) if screening_id else record["report"]
+            filename, pdf_data = generate_pdf_bytes(record["prediction_result"], report_text)
+            _persist_pdf(filename, pdf_data, screening_id, store, replace=bool(stored_path))
 
-        with open(str(pdf_path), "rb") as f:
-            pdf_data = f.read()
+        pdf_log.write({
+            "ts": datetime.utcnow().isoformat() + "Z",
+            "filename": filename,
+            "size": len(pdf_data)
+        })
 
         return pdf_data, 200, {
-            "Content-Type": "application/pdf",
-            "Content-Disposition": f"attachment; filename={Path(str(pdf_path)).name}"
+            "Content-Type": report_content_type(filename),
+            "Content-Disposition": f"attachment; filename={filename}"
         }
         
+    except PDFPoolFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
     except Exception as e:
         print(f"Error: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/screen", methods=["POST"])
+def api_screen():
+    """Predict, generate the report and render the PDF in one request, streamed as server-sent events"""
+    data = request.get_json(silent=True)
+    print(f"\n[API] POST /api/screen")
+
+    error = validate_predict_payload(data)
+    if error:
+        return jsonify({"error": error}), 400
+    remote = request.remote_addr
+    store = get_result_store()
+
+    def events():
+        stage = "prediction"
+        try:
+            # The risk level goes out before the (slow) LLM report is started
+            result = predict_autism_risk(data)
+            screening_id = store.create(result)
+            predict_log.write({
+                "ts": datetime.utcnow().isoformat() + "Z",
+                "remote": remote,
+                "payload": data,
+                "result": result
+            })
+            yield sse_event("prediction", {**result, "screening_id": screening_id})
+
+            stage = "report"
+            report_text = generate_risk_report(result)
+            store.update(screening_id, report=report_text)
+            yield sse_event("report", {"report": report_text})
+
+            stage = "pdf"
+            pdf_path = Path(str(generate_pdf_report(result, report_text)))
+            store.update(screening_id, pdf_path=str(pdf_path))
+            size = pdf_path.stat().st_size
+            pdf_log.write({
+                "ts": datetime.utcnow().isoformat() + "Z",
+                "pdf_path": str(pdf_path),
+                "size": size
+            })
+            yield sse_event("pdf", {"filename": pdf_path.name, "size": size, "url": report_link(pdf_path.name)})
+            yield sse_event("done", {})
+            print(f"[API] ✓ Screening streamed\n")
+        except Exception as e:
+            print(f"[API] ❌ Screening failed at {stage}: {e}")
+            traceback.print_exc()
+            yield sse_event("error", {"stage": stage, "error": str(e)})
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.route("/api/reports/<name>", methods=["GET"])
+def api_download_report(name):
+    """Download a report produced by /api/screen (link signed with ?token=)"""
+    if not valid_report_link(name, request.args.get("token", "")):
+        return jsonify({"error": "Report not found"}), 404
+    store = get_artifact_store()
+    path = store.path_for(name)
+    try:
+        # Opened before sending, so the retention sweeper cannot remove it mid-response
+        f = open(str(path), "rb") if store.touch(path) else None
+    except FileNotFoundError:
+        f = None
+    if f is None:
+        return jsonify({"error": "Report not found or expired; generate it again"}), 404
+    return send_file(f, mimetype=report_content_type(name), as_attachment=True, download_name=name)
+
+
 @app.route("/api/questions", methods=["GET"])
 def api_get_questions():
     """Get Q-CHAT-10 questions"""
-    questions = [
-        {"id": 1, "question": "Does your child make and maintain eye contact?", "options": ["Always", "Usually", "Sometimes", "Rarely", "Never"]},
-        {"id": 2, "question": "Does your child respond to their name when called?", "options": ["Always", "Usually", "Sometimes", "Rarely", "Never"]},
-        {"id": 3, "question": "Does your child engage in back-and-forth interaction?", "options": ["Always", "Usually", "Sometimes", "Rarely", "Never"]},
-        {"id": 4, "question": "Does your child point to share interest?", "options": ["Always", "Usually", "Sometimes", "Rarely", "Never"]},
-        {"id": 5, "question": "Does your child use gestures?", "options": ["Always", "Usually", "Sometimes", "Rarely", "Never"]},
-        {"id": 6, "question": "Does your child babble or use speech sounds?", "options": ["Always", "Usually", "Sometimes", "Rarely", "Never"]},
-        {"id": 7, "question": "Does your child imitate sounds or words?", "options": ["Always", "Usually", "Sometimes", "Rarely", "Never"]},
-        {"id": 8, "question": "Does your child show interest in playing?", "options": ["Always", "Usually", "Sometimes", "Rarely", "Never"]},
-        {"id": 9, "question": "Does your child adapt to changes?", "options": ["Always", "Usually", "Sometimes", "Rarely", "Never"]},
-        {"id": 10, "question": "Does your child show typical sensory response?", "options": ["Always", "Usually", "Sometimes", "Rarely", "Never"]}
-    ]
-    return jsonify({"questions": questions}), 200
+    return jsonify({"questions": QCHAT_QUESTIONS}), 200
 
 
 if __name__ == "__main__":
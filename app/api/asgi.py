@@ -0,0 +1,503 @@
+"""
+ASGI (async) API for Autism Pre-Screening Tool
+
+Same routes and responses as app.py, served by an async server. LLM calls are
+awaited, so a slow Groq response holds no worker thread; prediction and PDF
+rendering are CPU-bound and run on a thread pool. Background jobs (?async=1)
+and the admin model reload run on threads as in app.py.
+
+Run with:
+    hypercorn app.api.asgi:app --bind 0.0.0.0:5000
+or:
+    python app/api/asgi.py
+"""
+
+import asyncio
+import os
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+from quart import Quart, request, jsonify, make_response
+from quart_cors import cors
+
+# Load environment variables
+load_dotenv()
+
+SCRIPT_DIR = Path(__file__).resolve().parent  # app/api
+PROJECT_ROOT = SCRIPT_DIR.parents[1]
+
+# Same path setup as app.py: root backend first, nested project for backward compatibility
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+nested_project = PROJECT_ROOT / "autism-prescreening-tool"
+if nested_project.exists():
+    sys.path.append(str(nested_project))
+    sys.path.append(str(nested_project / "src"))
+
+from src.inference import (
+    predict_autism_risk, predict_autism_risk_batch, init_predictor, readiness,
+    model_version, start_model_watcher
+)
+from src.llm_report_groq import agenerate_risk_report, astream_risk_report
+from src.jobs import get_job_queue
+from src.pdf_generator import generate_pdf_bytes, get_pdf_generator, report_content_type
+from src.pdf_pool import enable_pdf_pool, PDFPoolFull
+from src.artifact_store import get_artifact_store
+from src.retention import get_retention_manager
+from src.log_writer import get_log_writer
+from src.api_common import (
+    QCHAT_QUESTIONS, validate_predict_payload, batch_records, validate_batch,
+    SSE_HEADERS, sse_event, report_link, valid_report_link, resolve_screening,
+    is_admin_request, wants_async, register_jobs, submit_job, job_status,
+    admin_reload_model, admin_model_status, admin_model_registry, admin_llm_status
+)
+from src.result_store import get_result_store
+
+app = Quart(__name__)
+app = cors(app, allow_origin="*", allow_methods=["GET", "POST"], allow_headers=["Content-Type"],
+           expose_headers=["X-Model-Version"])
+
+PREDICT_BATCH_MAX = int(os.getenv("PREDICT_BATCH_MAX", "5000"))
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "background").lower()
+# In-memory PDF rendering: "async" / "sync" / "off" persistence to reports/ (see app.py)
+PDF_PERSIST = os.getenv("PDF_PERSIST", "async").lower()
+# PDFs render on the process pool (PDF_POOL_WORKERS), see src/pdf_pool.py
+enable_pdf_pool()
+# "report" / "pdf": precompute artifacts for every new screening (see app.py)
+SPECULATIVE_ARTIFACTS = os.getenv("SPECULATIVE_ARTIFACTS", "off").lower()
+
+# Threads for CPU-bound and blocking work (prediction, PDF rendering, result store / report
+# cache SQLite, job files); the event loop never blocks on it
+CPU_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ASGI_CPU_WORKERS", "4")), thread_name_prefix="asgi-cpu"
+)
+
+LOGS_DIR = PROJECT_ROOT / "logs"
+predict_log = get_log_writer(LOGS_DIR / "predict_requests.log")
+pdf_log = get_log_writer(LOGS_DIR / "pdf_requests.log")
+
+
+async def run_cpu(fn, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(CPU_EXECUTOR, partial(fn, *args, **kwargs))
+
+
+def _load_and_warm_up_model():
+    try:
+        init_predictor()
+        print("[ASGI] ✓ Model loaded and warmed up")
+    except Exception as e:
+        print(f"[ASGI] ❌ Model warm-up failed: {e}")
+        traceback.print_exc()
+
+
+# Same job kinds as app.py, so a shared JOB_QUEUE_DIR works with either server
+jobs = register_jobs(get_job_queue())
+
+
+async def _submit_job(kind, data):
+    body, status, headers = await run_cpu(submit_job, kind, data)
+    return jsonify(body), status, headers
+
+
+@app.before_serving
+async def startup():
+    start_model_watcher()
+    await run_cpu(jobs.start)
+    get_retention_manager().start_sweeper()
+    if MODEL_LOAD_MODE == "sync":
+        await run_cpu(_load_and_warm_up_model)
+    else:
+        asyncio.get_running_loop().run_in_executor(CPU_EXECUTOR, _load_and_warm_up_model)
+
+
+@app.after_request
+async def add_model_version_header(response):
+    version = model_version()
+    if version:
+        response.headers["X-Model-Version"] = version
+    return response
+
+
+@app.route("/health", methods=["GET"])
+async def health():
+    return jsonify({
+        "status": "healthy",
+        "service": "Autism Pre-Screening API",
+        "version": "1.0.0"
+    }), 200
+
+
+@app.route("/ready", methods=["GET"])
+async def ready():
+    """Readiness: 200 only once the model is loaded and warmed up"""
+    state = readiness()
+    return jsonify(state), (200 if state["ready"] else 503)
+
+
+@app.route("/api/admin/reload-model", methods=["POST"])
+async def api_reload_model():
+    """Load new model artifacts, canary-check them and swap them in without a restart"""
+    if not is_admin_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    body, status = await run_cpu(admin_reload_model)
+    return jsonify(body), status
+
+
+@app.route("/api/admin/model", methods=["GET"])
+async def api_model_status():
+    """Serving model version, reload history and prediction cache counters"""
+    if not is_admin_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(admin_model_status()), 200
+
+
+@app.route("/api/admin/models", methods=["GET"])
+async def api_model_registry():
+    """Primary vs shadow model outputs and latencies"""
+    if not is_admin_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(admin_model_registry()), 200
+
+
+@app.route("/api/admin/llm", methods=["GET"])
+async def api_llm_status():
+    """LLM client, report cache, result store, single-flight, PDF pool, artifact store and retention stats"""
+    if not is_admin_request(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(await run_cpu(admin_llm_status)), 200
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+async def api_job_status(job_id):
+    """Status of a report/PDF job: queued, running, succeeded (with result) or failed (with error)"""
+    body, status = await run_cpu(job_status, job_id)
+    return jsonify(body), status
+
+
+@app.route("/api/predict", methods=["POST"])
+async def api_predict():
+    """Predict autism risk"""
+    try:
+        data = await request.get_json()
+        print(f"\n[API] POST /api/predict")
+
+        predict_log.write({
+            "ts": datetime.utcnow().isoformat() + "Z",
+            "remote": request.remote_addr,
+            "payload": data
+        })
+
+        error = validate_predict_payload(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        result = await run_cpu(predict_autism_risk, data)
+        result = {**result, "screening_id": await run_cpu(get_result_store().create, result)}
+        if SPECULATIVE_ARTIFACTS in ("report", "pdf"):
+            app.add_background_task(_speculate, result["screening_id"])
+        print(f"[API] ✓ Prediction successful\n")
+
+        predict_log.write({
+            "ts": datetime.utcnow().isoformat() + "Z",
+            "remote": request.remote_addr,
+            "payload": data,
+            "result": result
+        })
+        return jsonify(result), 200
+
+    except Exception as e:
+        print(f"[API] ❌ Error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+async def _speculate(screening_id):
+    """Precompute the report (and PDF) of a new screening before it is asked for"""
+    try:
+        store = get_result_store()
+        record = await run_cpu(store.get, screening_id)
+        if record is None or record.get("report") is not None:
+            return
+        report_text = await agenerate_risk_report(record["prediction_result"])
+        report_text = await run_cpu(store.setdefault, screening_id, "report", report_text)
+        if SPECULATIVE_ARTIFACTS == "pdf" and (await run_cpu(store.get, screening_id)).get("pdf_path") is None:
+            pdf_path, _ = await run_cpu(_render_pdf, record["prediction_result"], report_text)
+            await run_cpu(store.setdefault, screening_id, "pdf_path", str(pdf_path))
+    except Exception as e:
+        print(f"[ASGI] Speculative artifacts for {screening_id} failed: {e}")
+
+
+@app.route("/api/predict/batch", methods=["POST"])
+async def api_predict_batch():
+    """Predict autism risk for many screenings in one request"""
+    try:
+        records = batch_records(await request.get_json(silent=True))
+        print(f"\n[API] POST /api/predict/batch")
+
+        error, details = validate_batch(records, PREDICT_BATCH_MAX)
+        if error:
+            body = {"error": error}
+            if details:
+                body["details"] = details
+            return jsonify(body), 400
+
+        results = await run_cpu(predict_autism_risk_batch, records)
+        print(f"[API] ✓ Batch prediction successful ({len(results)} records)\n")
+        return jsonify({"count": len(results), "results": results}), 200
+
+    except Exception as e:
+        print(f"[API] ❌ Batch error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/generate-report", methods=["POST"])
+async def api_generate_report():
+    """Generate detailed report from prediction result (or a stored screening_id)"""
+    try:
+        data = await request.get_json()
+        print(f"\n[API] POST /api/generate-report")
+
+        store = get_result_store()
+        screening_id, record, error, status = await run_cpu(resolve_screening, data, store)
+        if error:
+            return jsonify({"error": error}), status
+
+        if wants_async(request.args, request.headers):
+            return await _submit_job("report", data)
+
+        report_text = record.get("report") if screening_id else None
+        if report_text is None:
+            report_text = await agenerate_risk_report(record["prediction_result"])
+            if screening_id:
+                # A report produced meanwhile (e.g. speculatively) wins, so report and PDF always match
+                report_text = await run_cpu(store.setdefault, screening_id, "report", report_text)
+        print(f"[API] ✓ Report generated successfully")
+
+        body = {"status": "success", "report": report_text}
+        if screening_id:
+            body["screening_id"] = screening_id
+        return jsonify(body), 200
+
+    except Exception as e:
+        print(f"[API] ❌ Report generation error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/generate-report/stream", methods=["POST"])
+async def api_generate_report_stream():
+    """Stream the report as server-sent events while the LLM writes it"""
+    data = await request.get_json(silent=True)
+    print(f"\n[API] POST /api/generate-report/stream")
+
+    store = get_result_store()
+    screening_id, record, error, status = await run_cpu(resolve_screening, data, store)
+    if error:
+        return jsonify({"error": error}), status
+
+    async def events():
+        try:
+            stored = record.get("report") if screening_id else None
+            if stored is not None:
+                yield sse_event("token", {"text": stored}).encode()
+            else:
+                parts = []
+                async for text in astream_risk_report(record["prediction_result"]):
+                    parts.append(text)
+                    yield sse_event("token", {"text": text}).encode()
+                if screening_id:
+                    await run_cpu(store.setdefault, screening_id, "report", "".join(parts))
+            yield sse_event("done", {"screening_id": screening_id}).encode()
+        except Exception as e:
+            print(f"[API] ❌ Report streaming error: {e}")
+            traceback.print_exc()
+            yield sse_event("error", {"error": str(e)}).encode()
+
+    response = await make_response(events(), 200, {"Content-Type": "text/event-stream", **SSE_HEADERS})
+    response.timeout = None
+    return response
+
+
+def _render_pdf(result, report_text):
+    """Render in memory and write the file to reports/ (runs on the CPU pool). Returns (path, data)."""
+    filename, data = generate_pdf_bytes(result, report_text)
+    return get_pdf_generator().save(filename, data), data
+
+
+async def _persist_pdf(filename, pdf_data, screening_id, store, replace=False):
+    """Write an in-memory render to reports/ according to PDF_PERSIST and record it on the screening"""
+    def saved(path):
+        if not screening_id:
+            return
+        if replace:
+            store.update(screening_id, pdf_path=str(path))
+        else:
+            store.setdefault(screening_id, "pdf_path", str(path))
+
+    if PDF_PERSIST == "async":
+        get_pdf_generator().save_async(filename, pdf_data, on_saved=saved)
+    elif PDF_PERSIST == "sync":
+        await run_cpu(saved, await run_cpu(get_pdf_generator().save, filename, pdf_data))
+
+
+@app.route("/api/generate-pdf", methods=["POST"])
+async def api_generate_pdf():
+    """Generate PDF report"""
+    try:
+        data = await request.get_json()
+
+        store = get_result_store()
+        screening_id, record, error, status = await run_cpu(resolve_screening, data, store)
+        if error:
+            return jsonify({"error": error}), status
+        if not screening_id and record["report"] is None:
+            return jsonify({"error": "Missing prediction_result or report_text"}), 400
+
+        pdf_log.write({
+            "ts": datetime.utcnow().isoformat() + "Z",
+            "remote": request.remote_addr,
+            "payload_summary": {
+                "screening_id": screening_id,
+                "has_prediction": "prediction_result" in data,
+                "report_length": len(str(data.get("report_text", "")))
+            }
+        })
+
+        if wants_async(request.args, request.headers):
+            return await _submit_job("pdf", data)
+
+        result = record["prediction_result"]
+        report_text = record.get("report")
+        if screening_id and report_text is None:
+            report_text = await agenerate_risk_report(result)
+            report_text = await run_cpu(store.setdefault, screening_id, "report", report_text)
+
+        # A stored screening renders its PDF once; repeated downloads reuse the file
+        stored_path = record.get("pdf_path") if screening_id else None
+        pdf_data = None
+        if stored_path and await run_cpu(get_artifact_store().touch, stored_path):
+            try:
+                pdf_data = await run_cpu(Path(stored_path).read_bytes)
+                filename = Path(stored_path).name
+            except FileNotFoundError:
+                pass  # removed by the retention sweeper since the touch: render it again
+        if pdf_data is None:
+            filename, pdf_data = await run_cpu(generate_pdf_bytes, result, report_text)
+            await _persist_pdf(filename, pdf_data, screening_id, store, replace=bool(stored_path))
+
+        pdf_log.write({
+            "ts": datetime.utcnow().isoformat() + "Z",
+            "filename": filename,
+            "size": len(pdf_data)
+        })
+
+        return pdf_data, 200, {
+            "Content-Type": report_content_type(filename),
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+
+    except PDFPoolFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/screen", methods=["POST"])
+async def api_screen():
+    """Predict, generate the report and render the PDF in one request, streamed as server-sent events"""
+    data = await request.get_json(silent=True)
+    print(f"\n[API] POST /api/screen")
+
+    error = validate_predict_payload(data)
+    if error:
+        return jsonify({"error": error}), 400
+    remote = request.remote_addr
+    store = get_result_store()
+
+    async def events():
+        stage = "prediction"
+        try:
+            result = await run_cpu(predict_autism_risk, data)
+            screening_id = await run_cpu(store.create, result)
+            predict_log.write({
+                "ts": datetime.utcnow().isoformat() + "Z",
+                "remote": remote,
+                "payload": data,
+                "result": result
+            })
+            yield sse_event("prediction", {**result, "screening_id": screening_id}).encode()
+
+            stage = "report"
+            report_text = await agenerate_risk_report(result)
+            await run_cpu(store.update, screening_id, report=report_text)
+            yield sse_event("report", {"report": report_text}).encode()
+
+            stage = "pdf"
+            pdf_path, pdf_data = await run_cpu(_render_pdf, result, report_text)
+            await run_cpu(store.update, screening_id, pdf_path=str(pdf_path))
+            pdf_log.write({
+                "ts": datetime.utcnow().isoformat() + "Z",
+                "pdf_path": str(pdf_path),
+                "size": len(pdf_data)
+            })
+            yield sse_event("pdf", {
+                "filename": pdf_path.name, "size": len(pdf_data), "url": report_link(pdf_path.name)
+            }).encode()
+            yield sse_event("done", {}).encode()
+        except Exception as e:
+            print(f"[API] ❌ Screening failed at {stage}: {e}")
+            traceback.print_exc()
+            yield sse_event("error", {"stage": stage, "error": str(e)}).encode()
+
+    response = await make_response(events(), 200, {"Content-Type": "text/event-stream", **SSE_HEADERS})
+    response.timeout = None  # the report may take longer than Quart's default response timeout
+    return response
+
+
+@app.route("/api/reports/<name>", methods=["GET"])
+async def api_download_report(name):
+    """Download a report produced by /api/screen (link signed with ?token=)"""
+    if not valid_report_link(name, request.args.get("token", "")):
+        return jsonify({"error": "Report not found"}), 404
+    store = get_artifact_store()
+    path = store.path_for(name)
+    try:
+        # Read in one go, so the retention sweeper cannot remove it mid-response
+        data = await run_cpu(path.read_bytes) if await run_cpu(store.touch, path) else None
+    except FileNotFoundError:
+        data = None
+    if data is None:
+        return jsonify({"error": "Report not found or expired; generate it again"}), 404
+    return data, 200, {
+        "Content-Type": report_content_type(name),
+        "Content-Disposition": f"attachment; filename={name}"
+    }
+
+
+@app.route("/api/questions", methods=["GET"])
+async def api_get_questions():
+    """Get Q-CHAT-10 questions"""
+    return jsonify({"questions": QCHAT_QUESTIONS}), 200
+
+
+if __name__ == "__main__":
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"0.0.0.0:{os.getenv('PORT', '5000')}"]
+
+    print("\n" + "=" * 60)
+    print("🚀 AUTISM PRE-SCREENING TOOL API (ASGI)")
+    print("=" * 60)
+    print(f"Running on http://{config.bind[0]}")
+    print("=" * 60 + "\n")
+
+    asyncio.run(serve(app, config))
@@ -0,0 +1,91 @@
+"""
+Production pre-fork server configuration
+
+    gunicorn -c app/api/gunicorn.conf.py app.api.app:app
+
+The master imports the app (and with it the model, sklearn/numpy and the
+report/PDF modules), loads and warms up the model once, then freezes the GC so
+the loaded objects stay in shared copy-on-write pages across forked workers.
+Workers are recycled after GUNICORN_MAX_REQUESTS requests to cap memory growth.
+
+New model artifacts: POST /api/admin/reload-model swaps the model in the
+worker that handles it and then sends HUP to the master. On HUP the master
+reloads its own copy if the artifacts changed (on_reload) and replaces every
+worker with one forked from it. A worker forked from a master that is still
+on older artifacts (e.g. after MODEL_WATCH_INTERVAL reloaded only the
+workers) reloads in post_fork, so every worker serves the files on disk.
+
+Signals (sent to the master):
+    HUP    graceful restart of all workers, reloading the master's model first if
+           the artifacts changed
+    TERM   graceful shutdown, waiting up to GUNICORN_GRACEFUL_TIMEOUT seconds
+    TTIN / TTOU   add / remove one worker
+    USR2   start a new master with new code next to the old one (zero-downtime upgrade)
+"""
+
+import gc
+import multiprocessing
+import os
+
+# Tell app.py it is being preloaded: load the model synchronously in the master
+# and leave background threads to the workers.
+os.environ["PREFORK_SERVER"] = "1"
+os.environ.setdefault("MODEL_LOAD_MODE", "sync")
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+
+# Threads per worker: report generation waits on the LLM, so sync workers would idle
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+preload_app = True
+
+# Worker recycling (jitter avoids all workers restarting at once)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    # The app and model are loaded at this point (preload_app) and no worker has forked yet.
+    # Move everything into the permanent generation so the collector never touches
+    # (and therefore never copies) those pages in the workers.
+    gc.collect()
+    gc.freeze()
+    server.log.info("Model preloaded; %d objects frozen for copy-on-write sharing", gc.get_freeze_count())
+
+
+def on_reload(server):
+    # HUP, runs in the master before the new workers are forked
+    from src.inference import get_model_manager
+    try:
+        if get_model_manager().reload_if_changed(reason="HUP") is not None:
+            # Release the old model (frozen objects are never collected), then freeze the new one
+            gc.unfreeze()
+            gc.collect()
+            gc.freeze()
+    except Exception as e:
+        server.log.error("Model reload in the master failed, workers fork from the current model: %s", e)
+
+
+def post_fork(server, worker):
+    from app.api.app import start_background_services
+    from src.inference import get_model_manager
+    try:
+        # The master's model may predate the artifacts on disk (a watcher reload in the workers)
+        get_model_manager().reload_if_changed(reason="newer artifacts than the preloaded model")
+    except Exception as e:
+        server.log.error("Model reload in worker %s failed, serving the preloaded model: %s", worker.pid, e)
+    start_background_services()
+
+
+def worker_exit(server, worker):
+    from src.log_writer import close_all_writers
+    close_all_writers()
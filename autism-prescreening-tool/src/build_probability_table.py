@@ -0,0 +1,82 @@
+"""
+Precompute calibrated probabilities for the whole model input space.
+
+The model only sees 10 binary Q-CHAT answers, age in months and three binary
+metadata flags, so every possible input can be scored once at build time.
+The result is saved next to calibrated_model.joblib and lets inference answer
+with an array lookup instead of a pandas/sklearn call.
+
+Table layout (probability_table.npz):
+    proba[age_mons - age_min, code]  (float64, exactly what the model returns)
+    code = sum(bit_j << j) over [a1..a10, sex, jaundice, family_mem_with_asd]
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import joblib
+
+from src.config import MODELS_DIR
+from src.model_pipeline import get_feature_config
+
+# Age range covered by the training data (Q-CHAT-10 toddlers)
+AGE_MIN = 12
+AGE_MAX = 36
+
+N_BINARY_FEATURES = 13  # a1..a10, sex, jaundice, family_mem_with_asd
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def enumerate_inputs(age_min=AGE_MIN, age_max=AGE_MAX):
+    """Return a (n_ages * 2**13, 14) matrix of every feature combination, in table order"""
+    codes = np.arange(1 << N_BINARY_FEATURES)
+    bits = (codes[:, None] >> np.arange(N_BINARY_FEATURES)) & 1
+
+    blocks = []
+    for age in range(age_min, age_max + 1):
+        block = np.empty((len(codes), 14), dtype=np.int64)
+        block[:, :10] = bits[:, :10]
+        block[:, 10] = age
+        block[:, 11:] = bits[:, 10:]
+        blocks.append(block)
+    return np.vstack(blocks)
+
+
+def main():
+    model_path = MODELS_DIR / "calibrated_model.joblib"
+    model = joblib.load(model_path)
+
+    feature_config = get_feature_config()
+    X = pd.DataFrame(enumerate_inputs(), columns=feature_config.numeric_cols)
+
+    # Full precision: a float32 round-off can move a probability across a risk threshold
+    proba = model.predict_proba(X)[:, 1].astype(np.float64)
+    proba = proba.reshape(AGE_MAX - AGE_MIN + 1, 1 << N_BINARY_FEATURES)
+
+    save_path = MODELS_DIR / "probability_table.npz"
+    np.savez_compressed(
+        save_path,
+        proba=proba,
+        age_min=np.int64(AGE_MIN),
+        age_max=np.int64(AGE_MAX),
+        model_sha256=np.array(file_sha256(model_path))
+    )
+
+    print("\n" + "=" * 70)
+    print("PROBABILITY TABLE SAVED")
+    print("Entries:", proba.size)
+    print("Ages:", AGE_MIN, "-", AGE_MAX)
+    print("Saved to:", save_path)
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
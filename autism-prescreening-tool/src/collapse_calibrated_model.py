@@ -0,0 +1,145 @@
+"""
+Collapse the 5-fold CalibratedClassifierCV into one model for serving.
+
+Each fold is a StandardScaler + LogisticRegression pipeline followed by a
+sigmoid (Platt) calibrator, so its calibrated output is itself a logistic
+function of the raw features:
+
+    p_i(x) = sigmoid(-(a_i * (w_i . (x - m_i) / s_i + c_i) + b_i))
+           = sigmoid(W_i . x + B_i)
+
+The serving model averages W_i and B_i into a single sigmoid(W . x + B), i.e.
+one dot product instead of five pipelines and five calibrators. It is saved in
+the NumPy format read by the backend (INFERENCE_BACKEND=numpy), and the
+deviation from the original ensemble is reported on the training data and on
+every possible input.
+
+Averaging is an approximation, so the collapsed model is a different model:
+it gets its own digest (and with it its own model_version; the ensemble's
+digest is kept as parent_sha256), so the ensemble's probability table is not
+used with it. The model is only written when no input changes risk band,
+unless --allow-band-changes is given.
+
+Usage:
+    python -m src.collapse_calibrated_model
+    python -m src.collapse_calibrated_model --allow-band-changes
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import joblib
+
+from src.config import MODELS_DIR, PROCESSED_TRAIN_PATH
+from src.model_pipeline import get_feature_config
+from src.build_probability_table import enumerate_inputs
+from src.export_numpy_model import export_calibrated_linear, file_sha256, load_evaluator
+
+
+def collapse(model):
+    """Average the per-fold calibrated logistic parameters into one linear model"""
+    params = export_calibrated_linear(model)
+    # Per-fold logit = -(a * (coef . x + intercept) + b)
+    weights = -params["cal_a"][:, None] * params["coef"]
+    biases = -(params["cal_a"] * params["intercept"] + params["cal_b"])
+
+    params.update({
+        "coef": weights.mean(axis=0, keepdims=True),
+        "intercept": np.array([biases.mean()]),
+        "cal_a": np.array([-1.0]),
+        "cal_b": np.array([0.0]),
+    })
+    return params
+
+
+def params_sha256(params):
+    """Digest of the serving model's parameters (its identity, used as model_version)"""
+    h = hashlib.sha256()
+    for name in sorted(params):
+        value = np.asarray(params[name])
+        h.update(f"{name}:{value.dtype.str}:{value.shape}".encode("utf-8"))
+        h.update(np.ascontiguousarray(value).tobytes())
+    return h.hexdigest()
+
+
+def risk_bands(proba, threshold):
+    """Same bands as the backend: High >= threshold, Medium >= 0.65 * threshold"""
+    return np.where(proba >= threshold, 2, np.where(proba >= threshold * 0.65, 1, 0))
+
+
+def report_deviation(name, expected, actual, threshold):
+    diff = np.abs(expected - actual)
+    flips = int(np.sum(risk_bands(expected, threshold) != risk_bands(actual, threshold)))
+    print(f"\n--- {name} ({len(expected)} rows) ---")
+    print("Max |p_ensemble - p_collapsed|:", f"{diff.max():.2e}")
+    print("Mean |p_ensemble - p_collapsed|:", f"{diff.mean():.2e}")
+    print("Risk band changes:", flips, f"({flips / len(expected):.4%})")
+    return flips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collapse the calibrated ensemble into one logistic model")
+    parser.add_argument("--allow-band-changes", action="store_true",
+                        help="save the model even if some inputs change risk band")
+    args = parser.parse_args()
+
+    source_path = MODELS_DIR / "calibrated_model.joblib"
+    model = joblib.load(source_path)
+    threshold = float(joblib.load(MODELS_DIR / "threshold_config.joblib").get("threshold", 0.5))
+    feature_config = get_feature_config()
+
+    params = collapse(model)
+    params.update({
+        "feature_names": np.array(feature_config.numeric_cols),
+        "threshold": np.float64(threshold),
+        "source_name": np.array("calibrated_model.joblib (collapsed)"),
+        "parent_sha256": np.array(file_sha256(source_path)),
+    })
+    params["source_sha256"] = np.array(params_sha256(params))
+
+    save_path = MODELS_DIR / "serving_model.npz"
+    tmp_path = MODELS_DIR / "serving_model.tmp.npz"
+    np.savez_compressed(tmp_path, **params)
+    collapsed = load_evaluator(tmp_path)
+
+    print("\n" + "=" * 70)
+    print(f"COLLAPSED {len(model.calibrated_classifiers_)}-FOLD CALIBRATED MODEL")
+    print("=" * 70)
+
+    X_train = pd.read_csv(PROCESSED_TRAIN_PATH)[feature_config.numeric_cols]
+    flips = report_deviation(
+        "Training data",
+        model.predict_proba(X_train)[:, 1],
+        collapsed.predict_proba(X_train.to_numpy())[:, 1],
+        threshold
+    )
+
+    X_all = enumerate_inputs()
+    flips += report_deviation(
+        "Every input (ages 12-36)",
+        model.predict_proba(pd.DataFrame(X_all, columns=feature_config.numeric_cols))[:, 1],
+        collapsed.predict_proba(X_all)[:, 1],
+        threshold
+    )
+
+    if flips and not args.allow_band_changes:
+        os.remove(tmp_path)
+        print(f"\n❌ Not saved: {flips} risk band changes versus the ensemble "
+              "(re-run with --allow-band-changes to accept them)")
+        return 1
+
+    os.replace(tmp_path, save_path)
+    print("\n✅ Saved serving model to:")
+    print(save_path)
+    print("Model version:", str(params["source_sha256"])[:12],
+          "(derived from calibrated_model.joblib", str(params["parent_sha256"])[:12] + ")")
+    print("Serve it with INFERENCE_BACKEND=numpy NUMPY_MODEL_FILE=serving_model.npz")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
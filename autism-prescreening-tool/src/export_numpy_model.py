@@ -0,0 +1,250 @@
+"""
+Export a saved model to the pure-NumPy format read by the backend's src/numpy_model.py.
+
+Supported sources:
+    calibrated_model.joblib  CalibratedClassifierCV(sigmoid) around the
+                             preprocessor + LogisticRegression pipeline
+    best_model.joblib        preprocessor + LogisticRegression / RandomForest / XGBoost pipeline
+
+Usage:
+    python -m src.export_numpy_model                      # calibrated_model.joblib -> numpy_model.npz
+    python -m src.export_numpy_model --source best_model.joblib --output best_model.npz
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+
+import numpy as np
+import pandas as pd
+import joblib
+
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from src.config import BASE_DIR, MODELS_DIR, PROCESSED_TRAIN_PATH
+from src.model_pipeline import get_feature_config
+
+# Backend evaluator, loaded by path like app/api/app.py does (the backend has its own `src`)
+EVALUATOR_PATH = BASE_DIR.parent / "src" / "numpy_model.py"
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def export_preprocessor(pipeline):
+    """SimpleImputer + StandardScaler parameters of a training pipeline"""
+    numeric = pipeline.named_steps["preprocessor"].named_transformers_["num"]
+    imputer = numeric.named_steps["imputer"]
+    scaler = numeric.named_steps["scaler"]
+    return {
+        "medians": np.asarray(imputer.statistics_, dtype=np.float64),
+        "mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "scale": np.asarray(scaler.scale_, dtype=np.float64),
+    }
+
+
+def export_calibrated_linear(model):
+    """Every fold of a sigmoid CalibratedClassifierCV around a linear pipeline"""
+    if model.method != "sigmoid":
+        raise ValueError(f"Only sigmoid calibration can be exported, got {model.method}")
+
+    folds = model.calibrated_classifiers_
+    coef, intercept, cal_a, cal_b = [], [], [], []
+    preprocessors = []
+    for fold in folds:
+        pipeline = fold.estimator
+        linear = pipeline.named_steps["model"]
+        if not isinstance(linear, LogisticRegression):
+            raise ValueError(f"Calibrated estimator must be LogisticRegression, got {type(linear).__name__}")
+        preprocessors.append(export_preprocessor(pipeline))
+        calibrator = fold.calibrators[0]
+
+        # Fold the fold's own scaler into its linear parameters so all folds share one input space
+        prep = preprocessors[-1]
+        w = linear.coef_[0] / prep["scale"]
+        coef.append(w)
+        intercept.append(linear.intercept_[0] - np.dot(w, prep["mean"]))
+        cal_a.append(calibrator.a_)
+        cal_b.append(calibrator.b_)
+
+    n_features = len(coef[0])
+    return {
+        "kind": np.array("linear"),
+        # Folds are trained on different splits; imputation uses the mean of their medians
+        "medians": np.mean([p["medians"] for p in preprocessors], axis=0),
+        "mean": np.zeros(n_features),
+        "scale": np.ones(n_features),
+        "coef": np.array(coef, dtype=np.float64),
+        "intercept": np.array(intercept, dtype=np.float64),
+        "cal_a": np.array(cal_a, dtype=np.float64),
+        "cal_b": np.array(cal_b, dtype=np.float64),
+    }
+
+
+def export_linear(pipeline):
+    linear = pipeline.named_steps["model"]
+    params = export_preprocessor(pipeline)
+    params.update({
+        "kind": np.array("linear"),
+        "coef": np.asarray(linear.coef_, dtype=np.float64),
+        "intercept": np.asarray(linear.intercept_, dtype=np.float64),
+        "cal_a": np.array([-1.0]),
+        "cal_b": np.array([0.0]),
+    })
+    return params
+
+
+def _pad_trees(trees):
+    """Stack per-tree node arrays into (n_trees, max_nodes) arrays"""
+    max_nodes = max(len(t["left"]) for t in trees)
+    out = {}
+    for name, dtype, fill in [
+        ("left", np.int64, -1), ("right", np.int64, -1), ("feature", np.int64, 0),
+        ("split", np.float64, 0.0), ("value", np.float64, 0.0), ("default_left", bool, False),
+    ]:
+        arr = np.full((len(trees), max_nodes), fill, dtype=dtype)
+        for i, t in enumerate(trees):
+            arr[i, :len(t[name])] = t[name]
+        out[name] = arr
+    out["depth"] = np.int64(max(t["depth"] for t in trees))
+    return out
+
+
+def export_forest(pipeline):
+    forest = pipeline.named_steps["model"]
+    positive = list(forest.classes_).index(1)
+    trees = []
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+        value = value / value.sum(axis=1, keepdims=True)
+        trees.append({
+            "left": tree.children_left,
+            "right": tree.children_right,
+            "feature": np.maximum(tree.feature, 0),
+            "split": tree.threshold,
+            "value": value[:, positive],
+            "default_left": np.zeros(tree.node_count, dtype=bool),
+            "depth": tree.max_depth,
+        })
+    params = export_preprocessor(pipeline)
+    params.update(_pad_trees(trees))
+    params["kind"] = np.array("forest")
+    return params
+
+
+def _tree_depth(left, right):
+    depth = 0
+    frontier = [(0, 0)]
+    while frontier:
+        node, d = frontier.pop()
+        depth = max(depth, d)
+        if left[node] >= 0:
+            frontier.append((left[node], d + 1))
+            frontier.append((right[node], d + 1))
+    return depth
+
+
+def export_xgboost(pipeline):
+    booster = pipeline.named_steps["model"].get_booster()
+    dump = json.loads(booster.save_raw("json"))
+    learner = dump["learner"]
+    if learner["objective"]["name"] != "binary:logistic":
+        raise ValueError(f"Only binary:logistic XGBoost models can be exported, got {learner['objective']['name']}")
+
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+    trees = []
+    for t in learner["gradient_booster"]["model"]["trees"]:
+        left = np.array(t["left_children"], dtype=np.int64)
+        right = np.array(t["right_children"], dtype=np.int64)
+        trees.append({
+            "left": left,
+            "right": right,
+            "feature": np.array(t["split_indices"], dtype=np.int64),
+            # XGBoost stores leaf weights in split_conditions
+            "split": np.array(t["split_conditions"], dtype=np.float32),
+            "value": np.array(t["split_conditions"], dtype=np.float64),
+            "default_left": np.array(t["default_left"], dtype=bool),
+            "depth": _tree_depth(left, right),
+        })
+    params = export_preprocessor(pipeline)
+    params.update(_pad_trees(trees))
+    params["kind"] = np.array("gbtree")
+    params["base_margin"] = np.float64(np.log(base_score / (1.0 - base_score)))
+    return params
+
+
+def export_model(model):
+    if isinstance(model, CalibratedClassifierCV):
+        return export_calibrated_linear(model)
+    if not isinstance(model, Pipeline):
+        raise ValueError(f"Unsupported model type: {type(model).__name__}")
+
+    estimator = model.named_steps["model"]
+    if isinstance(estimator, LogisticRegression):
+        return export_linear(model)
+    if isinstance(estimator, RandomForestClassifier):
+        return export_forest(model)
+    if type(estimator).__name__ == "XGBClassifier":
+        return export_xgboost(model)
+    raise ValueError(f"Unsupported estimator: {type(estimator).__name__}")
+
+
+def load_evaluator(path):
+    spec = importlib.util.spec_from_file_location("backend_numpy_model", str(EVALUATOR_PATH))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.NumpyModel(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="calibrated_model.joblib", help="model file in models/")
+    parser.add_argument("--output", default="numpy_model.npz", help="output file in models/")
+    args = parser.parse_args()
+
+    source_path = MODELS_DIR / args.source
+    model = joblib.load(source_path)
+    threshold_config = joblib.load(MODELS_DIR / "threshold_config.joblib")
+    feature_config = get_feature_config()
+
+    params = export_model(model)
+    params.update({
+        "feature_names": np.array(feature_config.numeric_cols),
+        "threshold": np.float64(threshold_config.get("threshold", 0.5)),
+        "source_name": np.array(args.source),
+        "source_sha256": np.array(file_sha256(source_path)),
+    })
+
+    save_path = MODELS_DIR / args.output
+    np.savez_compressed(save_path, **params)
+
+    # Check the export against the original model on the training data
+    X = pd.read_csv(PROCESSED_TRAIN_PATH)[feature_config.numeric_cols]
+    expected = model.predict_proba(X)[:, 1]
+    actual = load_evaluator(save_path).predict_proba(X.to_numpy())[:, 1]
+    max_diff = float(np.max(np.abs(expected - actual)))
+
+    print("\n" + "=" * 70)
+    print("NUMPY MODEL EXPORTED")
+    print("Source:", source_path)
+    print("Kind:", str(params["kind"]))
+    print("Max |p_sklearn - p_numpy| on training data:", f"{max_diff:.2e}")
+    print("Saved to:", save_path)
+    print("=" * 70)
+
+    if max_diff > 1e-6:
+        raise SystemExit(f"Exported model deviates from the original by {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Request handling shared by the Flask (app/api/app.py) and ASGI (app/api/asgi.py) servers
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+
+from src.artifact_store import get_artifact_store
+from src.inference import get_model_manager, get_registry, model_version, prediction_cache_info, reload_model
+from src.jobs import JobQueueFull, get_job_queue
+from src.llm_report_groq import generate_risk_report, get_generator
+from src.log_writer import get_log_writer
+from src.pdf_generator import generate_pdf_report, get_pdf_generator
+from src.pdf_pool import get_pdf_pool
+from src.report_cache import get_report_cache
+from src.result_store import get_result_store
+from src.retention import get_retention_manager
+
+# Signs report download links handed out by /api/screen. Set it when several hosts serve the
+# same reports/ directory; otherwise a per-process key is used (shared by pre-forked workers).
+REPORT_LINK_SECRET = (os.getenv("REPORT_LINK_SECRET") or os.urandom(32).hex()).encode()
+
+REPORT_NAME_PATTERN = re.compile(r"^[\w.-]+\.(pdf|txt)$")
+
+REQUIRED_PREDICT_FIELDS = ["age_mons", "gender", "jaundice", "family_mem_with_asd", "qchat_answers"]
+
+QCHAT_OPTIONS = ["Always", "Usually", "Sometimes", "Rarely", "Never"]
+
+QCHAT_QUESTIONS = [
+    {"id": 1, "question": "Does your child make and maintain eye contact?", "options": QCHAT_OPTIONS},
+    {"id": 2, "question": "Does your child respond to their name when called?", "options": QCHAT_OPTIONS},
+    {"id": 3, "question": "Does your child engage in back-and-forth interaction?", "options": QCHAT_OPTIONS},
+    {"id": 4, "question": "Does your child point to share interest?", "options": QCHAT_OPTIONS},
+    {"id": 5, "question": "Does your child use gestures?", "options": QCHAT_OPTIONS},
+    {"id": 6, "question": "Does your child babble or use speech sounds?", "options": QCHAT_OPTIONS},
+    {"id": 7, "question": "Does your child imitate sounds or words?", "options": QCHAT_OPTIONS},
+    {"id": 8, "question": "Does your child show interest in playing?", "options": QCHAT_OPTIONS},
+    {"id": 9, "question": "Does your child adapt to changes?", "options": QCHAT_OPTIONS},
+    {"id": 10, "question": "Does your child show typical sensory response?", "options": QCHAT_OPTIONS}
+]
+
+
+def validate_predict_payload(data):
+    """Validate and normalize one screening payload in place. Returns an error message or None."""
+    if not data:
+        return "No JSON data provided"
+    if not isinstance(data, dict):
+        return "Expected a JSON object"
+
+    # Validate all required fields
+    missing = [f for f in REQUIRED_PREDICT_FIELDS if f not in data]
+    if missing:
+        return f"Missing fields: {missing}"
+
+    # Validate qchat_answers has 10 entries
+    qchat = data.get("qchat_answers", {})
+    if not isinstance(qchat, dict) or len(qchat) != 10:
+        return f"Expected 10 Q-CHAT answers, got {len(qchat) if isinstance(qchat, dict) else 0}"
+
+    # Values the feature builder converts with int(): reject them here rather than fail at scoring
+    age = _as_int(data["age_mons"])
+    if age is None or not -2**63 <= age < 2**63:
+        return f"age_mons must be a number, got {data['age_mons']!r}"
+    for field in ("gender", "jaundice", "family_mem_with_asd"):
+        if not isinstance(data[field], str) and _as_int(data[field]) is None:
+            return f"{field} must be a string or a number, got {data[field]!r}"
+
+    # Convert to correct format
+    if isinstance(list(qchat.keys())[0], str):
+        try:
+            data["qchat_answers"] = {int(k): v for k, v in qchat.items()}
+        except ValueError:
+            return f"Q-CHAT answer keys must be the question numbers 1-10, got {list(qchat.keys())}"
+    return None
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def batch_records(data):
+    """Extract the record list from a batch body: a bare list or {"records": [...]}"""
+    return data.get("records") if isinstance(data, dict) else data
+
+
+def validate_batch(records, max_records):
+    """Validate a batch in place. Returns (error message, per-record details) or (None, None)."""
+    if not isinstance(records, list) or not records:
+        return "Expected a non-empty list of records", None
+    if len(records) > max_records:
+        return f"Batch too large: {len(records)} records (max {max_records})", None
+
+    errors = []
+    for index, record in enumerate(records):
+        error = validate_predict_payload(record)
+        if error:
+            errors.append({"index": index, "error": error})
+    if errors:
+        return "Invalid records", errors
+    return None, None
+
+
+# Response headers for text/event-stream endpoints (X-Accel-Buffering: nginx forwards events immediately)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def report_link_token(name):
+    return hmac.new(REPORT_LINK_SECRET, name.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def report_link(name):
+    """Download URL for a generated report file (served by GET /api/reports/<name>)"""
+    return f"/api/reports/{name}?token={report_link_token(name)}"
+
+
+def valid_report_link(name, token):
+    if not name or not REPORT_NAME_PATTERN.match(name) or not token:
+        return False
+    return hmac.compare_digest(token, report_link_token(name))
+
+
+def resolve_screening(data, store):
+    """Resolve a report/PDF request body to (screening_id, record, error, status).
+
+    Bodies carry either a screening_id from /api/predict (the stored record is used)
+    or, as before, the full prediction_result (and report_text); screening_id is then None.
+    """
+    if not isinstance(data, dict):
+        return None, None, "No JSON data provided", 400
+    screening_id = data.get("screening_id")
+    if screening_id:
+        record = store.get(str(screening_id))
+        if record is None:
+            return screening_id, None, "Unknown or expired screening_id", 404
+        return screening_id, record, None, None
+    if "prediction_result" not in data:
+        return None, None, "Missing screening_id or prediction_result", 400
+    return None, {"prediction_result": data["prediction_result"], "report": data.get("report_text")}, None, None
+
+
+# ---------------------------------------------------------------------------
+# Reports, PDFs, background jobs and admin endpoints. Blocking (SQLite, files,
+# LLM, rendering): the ASGI server calls these through its CPU thread pool.
+# ---------------------------------------------------------------------------
+
+# Shared secret for /api/admin/* endpoints (admin endpoints are disabled when unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+LOGS_DIR = Path(__file__).resolve().parents[1] / "logs"
+
+
+def is_admin_request(headers):
+    token = headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def wants_async(args, headers):
+    """?async=1 or "Prefer: respond-async" asks for a 202 and a job instead of waiting"""
+    return args.get("async") == "1" or "respond-async" in headers.get("Prefer", "")
+
+
+def screening_report(screening_id, record, store):
+    """Report text for a resolved request; generated once and kept for stored screenings"""
+    report_text = record.get("report") if screening_id else None
+    if report_text is None:
+        print(f"[API] Generating report for result: {record['prediction_result']}")
+        report_text = generate_risk_report(record["prediction_result"])
+        if screening_id:
+            # A report produced meanwhile (e.g. speculatively) wins, so report and PDF always match
+            report_text = store.setdefault(screening_id, "report", report_text)
+    return report_text
+
+
+def screening_pdf(screening_id, record, store):
+    """PDF path for a resolved request; a stored screening renders its PDF once"""
+    pdf_path = record.get("pdf_path") if screening_id else None
+    if pdf_path and get_artifact_store().touch(pdf_path):
+        return pdf_path
+    report_text = screening_report(screening_id, record, store) if screening_id else record["report"]
+    pdf_path = generate_pdf_report(record["prediction_result"], report_text)
+    if screening_id:
+        if record.get("pdf_path"):
+            store.update(screening_id, pdf_path=str(pdf_path))  # replaces a file that was removed
+        else:
+            pdf_path = store.setdefault(screening_id, "pdf_path", str(pdf_path))
+    return pdf_path
+
+
+def resolve_job_request(params):
+    store = get_result_store()
+    screening_id, record, error, _ = resolve_screening(params, store)
+    if error:
+        raise ValueError(error)
+    return screening_id, record, store
+
+
+def report_job(params):
+    """Background job: same work as POST /api/generate-report"""
+    screening_id, record, store = resolve_job_request(params)
+    return {"screening_id": screening_id, "report": screening_report(screening_id, record, store)}
+
+
+def pdf_job(params):
+    """Background job: same work as POST /api/generate-pdf; the PDF is fetched from its download link"""
+    screening_id, record, store = resolve_job_request(params)
+    pdf_path = Path(str(screening_pdf(screening_id, record, store)))
+    try:
+        size = pdf_path.stat().st_size
+    except FileNotFoundError:
+        # Removed by the retention sweeper since it was looked up: render it again
+        pdf_path = Path(str(screening_pdf(screening_id, record, store)))
+        size = pdf_path.stat().st_size
+    get_log_writer(LOGS_DIR / "pdf_requests.log").write({
+        "ts": datetime.utcnow().isoformat() + "Z",
+        "pdf_path": str(pdf_path),
+        "size": size
+    })
+    return {"screening_id": screening_id, "filename": pdf_path.name, "size": size, "url": report_link(pdf_path.name)}
+
+
+def register_jobs(jobs):
+    """Job kinds served by both servers (same names, so a shared JOB_QUEUE_DIR works with either)"""
+    jobs.register("report", report_job, workers=4)
+    jobs.register("pdf", pdf_job, workers=2)
+    return jobs
+
+
+def submit_job(kind, data):
+    """Queue a report/PDF job. Returns (body, status, headers)."""
+    try:
+        job_id = get_job_queue().submit(kind, data)
+    except JobQueueFull as e:
+        return {"error": str(e)}, 503, {"Retry-After": "5"}
+    status_url = f"/api/jobs/{job_id}"
+    print(f"[API] ✓ Queued {kind} job {job_id}")
+    return {"job_id": job_id, "status": "queued", "status_url": status_url}, 202, {"Location": status_url}
+
+
+def job_status(job_id):
+    """Status of a report/PDF job: queued, running, succeeded (with result) or failed (with error)"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return {"error": "Unknown or expired job"}, 404
+    return job, 200
+
+
+def admin_reload_model(on_reloaded=None):
+    """Reload and swap the model. on_reloaded(swap) may add fields. Returns (body, status)."""
+    try:
+        swap = reload_model(reason="admin request")
+    except Exception as e:
+        print(f"[API] ❌ Model reload failed: {e}")
+        return {"status": "failed", "error": str(e), "model_version": model_version()}, 500
+    if on_reloaded is not None:
+        on_reloaded(swap)
+    return {"status": "reloaded", **swap}, 200
+
+
+def admin_model_status():
+    """Serving model version, reload history and prediction cache counters"""
+    return {**get_model_manager().status(), "prediction_cache": prediction_cache_info()}
+
+
+def admin_model_registry():
+    """Primary vs shadow model outputs and latencies"""
+    return get_registry().snapshot()
+
+
+def admin_llm_status():
+    """LLM client calls, retries and circuit breaker state, report cache, result store, single-flight, PDF pool, artifact store and retention stats"""
+    llm = get_generator().llm
+    cache = get_report_cache()
+    pool = get_pdf_pool()
+    return {
+        "llm": llm.stats() if llm else None,
+        "report_cache": cache.stats() if cache else None,
+        "result_store": get_result_store().stats(),
+        "report_single_flight": get_generator().inflight.stats(),
+        "pdf_single_flight": get_pdf_generator().inflight.stats(),
+        "pdf_pool": pool.stats() if pool else None,
+        "artifacts": get_artifact_store().stats(),
+        "retention": get_retention_manager().stats()
+    }
@@ -0,0 +1,126 @@
+"""
+Content-addressed report storage
+
+Rendered reports are stored under a name derived from a hash of everything
+that goes into them (the rendered prediction fields, report text, template
+version), so identical reports are rendered and written once, and two different
+reports can never overwrite each other (timestamp names collided within the
+same second).
+
+Files live in sharded subdirectories of the reports directory:
+
+    reports/3f/autism_screening_3f9c...e1.pdf
+
+and are written to a temporary file and renamed into place, so readers never
+see a partial file. Older timestamp-named reports directly in reports/ are
+still found by name. Each reuse sets the file's access time, which the
+retention sweeper (src/retention.py) uses to evict least recently used reports.
+
+Environment configuration:
+    ARTIFACT_DIR   root directory (default <project>/reports)
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+ARTIFACT_PREFIX = "autism_screening_"
+_ARTIFACT_NAME = re.compile(r"^" + ARTIFACT_PREFIX + r"([0-9a-f]{64})\.(pdf|txt)$")
+
+
+def artifact_key(prediction_result, report_text, template_version):
+    """Hash of everything that ends up in the document (pass only the fields that are rendered)"""
+    data = json.dumps([str(template_version), prediction_result, report_text], sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def artifact_name(key, extension):
+    return f"{ARTIFACT_PREFIX}{key}.{extension}"
+
+
+class ArtifactStore:
+    """Write-once report files addressed by content hash"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.writes = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv("ARTIFACT_DIR") or PROJECT_ROOT / "reports")
+
+    def path_for(self, name):
+        """Where a report with this file name lives (sharded for content-addressed names)"""
+        match = _ARTIFACT_NAME.match(name)
+        if match is None:
+            return self.root / name  # timestamp-named report from before content addressing
+        return self.root / match.group(1)[:2] / name
+
+    def get(self, key, extension):
+        """Path of the stored report or None"""
+        path = self.path_for(artifact_name(key, extension))
+        if not self.touch(path):
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, name, data):
+        """Store a report unless it is already present; returns its path"""
+        path = self.path_for(name)
+        if self.touch(path):
+            with self._lock:
+                self.hits += 1
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=".tmp-", suffix=path.suffix)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # Same name means same content, so a concurrent writer replacing it is harmless
+            os.replace(tmp, str(path))
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        with self._lock:
+            self.writes += 1
+        return path
+
+    def touch(self, path):
+        """Mark a stored report as used now (keeps its write time). False if it does not exist."""
+        try:
+            os.utime(str(path), (time.time(), os.stat(str(path)).st_mtime))
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError:
+            return os.path.exists(str(path))  # not ours to modify (e.g. another user's file)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "writes": self.writes, "root": str(self.root)}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """Process-wide artifact store, configured from the environment on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore.from_env()
+    return _store
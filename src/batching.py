@@ -0,0 +1,86 @@
+"""
+Micro-batching for concurrent predictions
+
+Coalesces predictions that arrive within a short window into one vectorized
+predict_batch call and hands each caller its own result.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class PredictionBatcher:
+    """Merge concurrent single predictions into batched model calls"""
+
+    def __init__(self, predict_batch_fn, window_ms=2.0, max_batch=64):
+        self.predict_batch_fn = predict_batch_fn
+        self.window = max(float(window_ms), 0.0) / 1000.0
+        self.max_batch = max(int(max_batch), 1)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+
+    def _ensure_started(self):
+        # Started on first use so a forking server never inherits a dead thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, data):
+        """Queue one payload; returns a Future that resolves to its result"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((data, future))
+        return future
+
+    def predict(self, data, timeout=None):
+        return self.submit(data).result(timeout=timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        records = [data for data, _ in batch]
+        self.batches += 1
+        self.requests += len(batch)
+        try:
+            results = self.predict_batch_fn(records)
+        except Exception:
+            # One bad payload must not fail its neighbours: retry one by one
+            for data, future in batch:
+                try:
+                    future.set_result(self.predict_batch_fn([data])[0])
+                except Exception as e:
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch_size": (self.requests / self.batches) if self.batches else 0.0,
+        }
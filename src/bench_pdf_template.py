@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: PDF rendering with and without the cached layout template
+
+"rebuilt" creates a fresh ReportTemplate (style sheet, table style, parsed
+headings) for every report, which is what each render used to do; "cached"
+reuses the process-wide template. Full renders go through the production
+PDFReportGenerator._render (same page setup, in memory), so the only
+difference between the two is the template.
+
+Usage:
+    python -m src.bench_pdf_template              # 200 renders per variant
+    python -m src.bench_pdf_template -n 1000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.llm_report_groq import ReportGenerator
+from src.pdf_generator import HAS_REPORTLAB, PDFReportGenerator, ReportTemplate, get_report_template
+
+SAMPLE_RESULT = {
+    "qchat_score": 7,
+    "qchat_risk_level": "High",
+    "qchat_referral_interpretation": "Strong indication for referral",
+    "model_probability_asd": 0.82,
+}
+
+
+class RebuildingGenerator(PDFReportGenerator):
+    """The production renderer with a fresh template per report (the old behaviour)"""
+
+    def _build_story(self, prediction_result, report_text):
+        return ReportTemplate().story(prediction_result, report_text)
+
+
+def timed(label, n, fn):
+    """Run fn n times and return milliseconds per call"""
+    fn()  # warm-up (font loading, imports)
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    per_call = (time.perf_counter() - start) / n * 1000
+    print(f"  {label:<18} {per_call:7.3f} ms")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cached PDF layout template")
+    parser.add_argument("-n", type=int, default=200, help="renders per variant")
+    args = parser.parse_args()
+
+    if not HAS_REPORTLAB:
+        print("❌ reportlab is not installed")
+        return 1
+
+    report_text = ReportGenerator()._generate_template_report(SAMPLE_RESULT)
+    cached = get_report_template()
+
+    print(f"Story only ({args.n} runs)")
+    story_rebuilt = timed("rebuilt", args.n, lambda: ReportTemplate().story(SAMPLE_RESULT, report_text))
+    story_cached = timed("cached", args.n, lambda: cached.story(SAMPLE_RESULT, report_text))
+
+    print(f"Full render to memory, PDFReportGenerator._render ({args.n} runs)")
+    rebuilding, generator = RebuildingGenerator(), PDFReportGenerator()
+    render_rebuilt = timed("rebuilt", args.n, lambda: rebuilding._render(SAMPLE_RESULT, report_text))
+    render_cached = timed("cached", args.n, lambda: generator._render(SAMPLE_RESULT, report_text))
+
+    print(f"✓ Saved {story_rebuilt - story_cached:.3f} ms per story "
+          f"({(1 - story_cached / story_rebuilt) * 100:.0f}%), "
+          f"{render_rebuilt - render_cached:.3f} ms per render "
+          f"({(1 - render_cached / render_rebuilt) * 100:.0f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
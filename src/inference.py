@@ -2,11 +2,21 @@
 ML Model Inference Module
 """
 
-import joblib
 import numpy as np
-import pandas as pd
 from pathlib import Path
+import hashlib
 import os
+import threading
+import time
+
+from src.numpy_model import NumpyModel
+from src.batching import PredictionBatcher
+from src.prediction_cache import PredictionCache
+from src.model_manager import ModelManager
+from src.model_registry import ModelRegistry
+
+# joblib/pandas (and through them sklearn) are imported lazily so the "numpy"
+# backend can serve without loading them at all.
 
 # Get correct project root path
 # This file is at autism-prescreening-tool/src/inference.py
@@ -33,6 +43,49 @@ print(f"[Inference] Project root: {PROJECT_ROOT}")
 print(f"[Inference] Models dir: {MODELS_DIR}")
 print(f"[Inference] Models dir exists: {MODELS_DIR.exists()}")
 
+# Column names as they were used during training
+FEATURE_COLUMNS = ['a1', 'a2', 'a3', 'a4', 'a5', 'a6', 'a7', 'a8', 'a9', 'a10',
+                   'age_mons', 'sex', 'jaundice', 'family_mem_with_asd']
+
+# Precomputed probabilities for every input combination (built by
+# autism-prescreening-tool/src/build_probability_table.py). Set to "0" to always use the model.
+USE_PROBABILITY_TABLE = os.getenv("USE_PROBABILITY_TABLE", "1") != "0"
+
+# "sklearn" loads PRIMARY_MODEL (calibrated_model.joblib); "numpy" loads a model exported by
+# autism-prescreening-tool/src/export_numpy_model.py and evaluates it with NumPy only.
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "sklearn").lower()
+PRIMARY_MODEL = os.getenv("PRIMARY_MODEL", "calibrated_model.joblib")
+NUMPY_MODEL_FILE = os.getenv("NUMPY_MODEL_FILE", "numpy_model.npz")
+
+# Comma-separated model files in MODELS_DIR scored in shadow next to the primary
+# (e.g. "best_model.joblib,serving_model.npz"). Shadow results never reach the response.
+SHADOW_MODELS = [name.strip() for name in os.getenv("SHADOW_MODELS", "").split(",") if name.strip()]
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "256"))
+
+# Micro-batching of concurrent predict_autism_risk calls (0 disables it)
+PREDICT_BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "0"))
+PREDICT_BATCH_SIZE = int(os.getenv("PREDICT_BATCH_SIZE", "64"))
+
+# LRU cache of model probabilities keyed on the feature vector (0 disables it)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+
+# Seconds between checks of the model artifacts for changes (0 disables hot reload polling)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+
+# Bit position of each binary feature in a probability table code
+_TABLE_BIT_COLUMNS = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 11, 12, 13]
+_TABLE_BIT_WEIGHTS = 1 << np.arange(len(_TABLE_BIT_COLUMNS), dtype=np.int64)
+_AGE_COLUMN = FEATURE_COLUMNS.index('age_mons')
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(str(path), "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
 
 class AutismPredictor:
     """Load and use the trained autism prediction model"""
@@ -40,29 +93,80 @@ class AutismPredictor:
     def __init__(self):
         self.model = None
         self.threshold_config = None
-        self.model_path = MODELS_DIR / "calibrated_model.joblib"
+        self.model_sha256 = None
+        self.probability_table = None
+        self.table_age_min = None
+        self.cache = PredictionCache(PREDICTION_CACHE_SIZE)
+        self.backend = INFERENCE_BACKEND
+        if self.backend == "numpy":
+            self.model_path = MODELS_DIR / NUMPY_MODEL_FILE
+        elif self.backend == "sklearn":
+            self.model_path = MODELS_DIR / PRIMARY_MODEL
+        else:
+            raise ValueError(f"Unknown INFERENCE_BACKEND: {self.backend} (expected 'sklearn' or 'numpy')")
         self.threshold_path = MODELS_DIR / "threshold_config.joblib"
+        self.table_path = MODELS_DIR / "probability_table.npz"
+        print(f"[Predictor] Backend: {self.backend}")
         print(f"[Predictor] Model path: {self.model_path}")
         print(f"[Predictor] Threshold path: {self.threshold_path}")
         self._load_model()
     
     def _load_model(self):
         """Load the trained model from disk"""
+        # Cached probabilities belong to the previous model
+        self.cache.clear()
         try:
             if not self.model_path.exists():
                 raise FileNotFoundError(f"Model not found at {self.model_path}")
-            if not self.threshold_path.exists():
-                raise FileNotFoundError(f"Threshold not found at {self.threshold_path}")
             
-            self.model = joblib.load(str(self.model_path))
-            self.threshold_config = joblib.load(str(self.threshold_path))
+            if self.backend == "numpy":
+                # Exported models carry their threshold and source digest
+                self.model = NumpyModel(self.model_path)
+                self.threshold_config = {"threshold": self.model.threshold}
+                self.model_sha256 = self.model.source_sha256
+            else:
+                import joblib
+                if not self.threshold_path.exists():
+                    raise FileNotFoundError(f"Threshold not found at {self.threshold_path}")
+                self.model = joblib.load(str(self.model_path))
+                self.threshold_config = joblib.load(str(self.threshold_path))
+                self.model_sha256 = _file_sha256(self.model_path)
             print(f"✓ Model loaded successfully")
         except Exception as e:
             print(f"❌ Model loading failed: {e}")
             raise
+        
+        if USE_PROBABILITY_TABLE:
+            self._load_probability_table()
     
-    def prepare_features(self, data):
-        """Convert user responses to model input format - returns DataFrame as expected by model"""
+    @property
+    def version(self):
+        """Short model version: the digest of the artifact the model was built from"""
+        return self.model_sha256[:12] if self.model_sha256 else None
+    
+    def artifact_paths(self):
+        """Files that define this predictor (watched for hot reload)"""
+        return [self.model_path, self.threshold_path, self.table_path]
+    
+    def _load_probability_table(self):
+        """Load the precomputed probability table if it matches the loaded model"""
+        self.probability_table = None
+        if not self.table_path.exists():
+            return
+        try:
+            with np.load(str(self.table_path)) as artifact:
+                if str(artifact["model_sha256"]) != self.model_sha256:
+                    print(f"[Predictor] Probability table is stale (built from a different model), ignoring it")
+                    return
+                self.probability_table = artifact["proba"].astype(np.float64)
+                self.table_age_min = int(artifact["age_min"])
+            print(f"✓ Probability table loaded: {self.probability_table.size} entries")
+        except Exception as e:
+            print(f"[Predictor] Warning: failed to load probability table: {e}")
+            self.probability_table = None
+    
+    def _feature_values(self, data):
+        """Convert one user response payload to the 14 model feature values"""
         qchat_answers = data.get("qchat_answers", {})
         qchat_features = []
         
@@ -96,59 +200,141 @@ class AutismPredictor:
         else:
             family_asd = 1 if int(family_asd_val) == 1 else 0
         
-        # Create DataFrame with proper column names (as model expects them)
-        features_dict = {
-            'a1': qchat_features[0], 'a2': qchat_features[1], 'a3': qchat_features[2],
-            'a4': qchat_features[3], 'a5': qchat_features[4], 'a6': qchat_features[5],
-            'a7': qchat_features[6], 'a8': qchat_features[7], 'a9': qchat_features[8],
-            'a10': qchat_features[9], 'age_mons': age_mons, 'sex': sex, 
-            'jaundice': jaundice, 'family_mem_with_asd': family_asd
-        }
-        
-        df = pd.DataFrame([features_dict])
+        # Same order as FEATURE_COLUMNS
+        return qchat_features + [age_mons, sex, jaundice, family_asd]
+    
+    def _feature_matrix(self, records):
+        """Convert many user responses into an (n, 14) integer matrix"""
+        rows = np.array([self._feature_values(data) for data in records], dtype=np.int64)
+        return rows.reshape(len(records), len(FEATURE_COLUMNS))
+    
+    def prepare_features(self, data):
+        """Convert user responses to model input format - returns DataFrame as expected by model"""
+        import pandas as pd
+        df = pd.DataFrame([self._feature_values(data)], columns=FEATURE_COLUMNS)
         print(f"[Features] DataFrame prepared with columns: {list(df.columns)}")
         print(f"[Features] Values: {df.values[0]}")
         return df
     
+    def prepare_features_batch(self, records):
+        """Convert many user responses into a single DataFrame (one row per record)"""
+        import pandas as pd
+        df = pd.DataFrame(self._feature_matrix(records), columns=FEATURE_COLUMNS)
+        print(f"[Features] Batch DataFrame prepared: {df.shape[0]} rows")
+        return df
+    
+    def _predict_probabilities(self, X):
+        """Return the ASD probability for every row of X in a single model call"""
+        if hasattr(self.model, "predict_proba"):
+            return self.model.predict_proba(X)[:, 1].astype(float)
+        return np.asarray(self.model.predict(X), dtype=float)
+    
+    def _lookup_probabilities(self, rows):
+        """Look rows up in the probability table. Returns (probabilities, hit mask)."""
+        n = rows.shape[0]
+        probabilities = np.full(n, np.nan)
+        if self.probability_table is None:
+            return probabilities, np.zeros(n, dtype=bool)
+        
+        age_index = rows[:, _AGE_COLUMN] - self.table_age_min
+        binary = rows[:, _TABLE_BIT_COLUMNS]
+        hit = (
+            (age_index >= 0) & (age_index < self.probability_table.shape[0])
+            & np.all((binary == 0) | (binary == 1), axis=1)
+        )
+        codes = binary[hit] @ _TABLE_BIT_WEIGHTS
+        probabilities[hit] = self.probability_table[age_index[hit], codes]
+        return probabilities, hit
+    
+    def _probabilities_for_rows(self, rows):
+        """ASD probability per feature row: table lookup, then the cache, then one model call"""
+        probabilities, hit = self._lookup_probabilities(rows)
+        
+        missing = []
+        for i in np.flatnonzero(~hit):
+            cached = self.cache.get(tuple(rows[i].tolist()))
+            if cached is None:
+                missing.append(i)
+            else:
+                probabilities[i] = cached
+        
+        if missing:
+            # Timed like a shadow call: building the model input plus the model itself
+            start = time.perf_counter()
+            if self.backend == "numpy":
+                X = rows[missing]
+            else:
+                import pandas as pd
+                X = pd.DataFrame(rows[missing], columns=FEATURE_COLUMNS)
+            probabilities[missing] = self._predict_probabilities(X)
+            get_registry().record_primary(self.model_path.name, time.perf_counter() - start, len(missing))
+            for i in missing:
+                self.cache.put(tuple(rows[i].tolist()), float(probabilities[i]))
+        return probabilities
+    
+    def _score_rows(self, rows):
+        """Probabilities for rows, mirrored to the shadow models"""
+        probabilities = self._probabilities_for_rows(rows)
+        get_registry().submit(rows, probabilities, float(self.threshold_config.get("threshold", 0.5)))
+        return probabilities
+    
+    def warm_up(self, payloads=None):
+        """Run throwaway predictions to prime the model's sklearn/numpy code paths"""
+        payloads = payloads or WARMUP_PAYLOADS
+        rows = self._feature_matrix(payloads)
+        # Go straight to the model (not the table or cache) so its code paths are exercised
+        for X in (rows[:1], rows):
+            if self.backend != "numpy":
+                import pandas as pd
+                X = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+            self._predict_probabilities(X)
+        self._lookup_probabilities(rows)
+        for data in payloads:
+            self._build_result(data, 0.5)
+        print(f"✓ Model warmed up with {len(payloads)} payloads")
+    
+    def cache_info(self):
+        """Hit/miss counters of the prediction cache"""
+        return self.cache.info()
+    
+    def _build_result(self, data, asd_probability):
+        """Turn a model probability into the API result for one payload"""
+        threshold = float(self.threshold_config.get("threshold", 0.5))
+        
+        # Risk level
+        if asd_probability >= threshold:
+            risk_level = "High"
+        elif asd_probability >= threshold * 0.65:
+            risk_level = "Medium"
+        else:
+            risk_level = "Low"
+        
+        # Q-CHAT score
+        qchat_answers = data.get("qchat_answers", {})
+        qchat_score = sum(
+            1 for i in range(1, 11)
+            if str(qchat_answers.get(i) or qchat_answers.get(str(i))).upper() == "A"
+        )
+        
+        interpretation = self._get_interpretation(risk_level, qchat_score)
+        
+        return {
+            "model_probability_asd": float(asd_probability),
+            "risk_threshold": threshold,
+            "qchat_score": int(qchat_score),
+            "qchat_risk_level": risk_level,
+            "qchat_referral_interpretation": interpretation,
+            "model_version": self.version,
+            "disclaimer": "This is a screening tool, not a diagnostic test. Professional evaluation is strongly recommended."
+        }
+    
     def predict(self, data):
         """Make prediction on input data"""
         try:
-            X = self.prepare_features(data)
-            
-            # Get probability
-            if hasattr(self.model, "predict_proba"):
-                probabilities = self.model.predict_proba(X)[0]
-                asd_probability = float(probabilities[1])
-            else:
-                asd_probability = float(self.model.predict(X)[0])
-            
-            threshold = float(self.threshold_config.get("threshold", 0.5))
-            
-            # Risk level
-            if asd_probability >= threshold:
-                risk_level = "High"
-            elif asd_probability >= threshold * 0.65:
-                risk_level = "Medium"
-            else:
-                risk_level = "Low"
-            
-            # Q-CHAT score
-            qchat_answers = data.get("qchat_answers", {})
-            qchat_score = sum(
-                1 for i in range(1, 11)
-                if str(qchat_answers.get(i) or qchat_answers.get(str(i))).upper() == "A"
-            )
-            
-            interpretation = self._get_interpretation(risk_level, qchat_score)
-            
-            result = {
-                "model_probability_asd": asd_probability,
-                "risk_threshold": threshold,
-                "qchat_score": int(qchat_score),
-                "qchat_risk_level": risk_level,
-                "qchat_referral_interpretation": interpretation,
-                "disclaimer": "This is a screening tool, not a diagnostic test. Professional evaluation is strongly recommended."
-            }
+            rows = self._feature_matrix([data])
+            print(f"[Features] Values: {rows[0]}")
+            asd_probability = float(self._score_rows(rows)[0])
+            result = self._build_result(data, asd_probability)
             
             print(f"[Prediction] Result: {result}")
             return result
@@ -157,25 +343,154 @@ class AutismPredictor:
             print(f"❌ Prediction error: {e}")
             raise ValueError(f"Prediction failed: {str(e)}")
     
+    def predict_batch(self, records):
+        """Make predictions for many payloads with a single model call"""
+        if not records:
+            return []
+        try:
+            probabilities = self._score_rows(self._feature_matrix(records))
+            results = [
+                self._build_result(data, prob)
+                for data, prob in zip(records, probabilities)
+            ]
+            print(f"[Prediction] Batch of {len(results)} scored")
+            return results
+        
+        except Exception as e:
+            print(f"❌ Batch prediction error: {e}")
+            raise ValueError(f"Batch prediction failed: {str(e)}")
+    
     def _get_interpretation(self, risk_level, qchat_score):
-        if risk_level == "High":
-            return f"Score {qchat_score}/10: Significant autism characteristics. Professional evaluation strongly recommended."
-        elif risk_level == "Medium":
-            return f"Score {qchat_score}/10: Some autism characteristics. Professional consultation recommended."
-        else:
-            return f"Score {qchat_score}/10: Lower autism characteristics. Monitor development."
+        return get_interpretation(risk_level, qchat_score)
+
+
+RISK_LEVELS = ["Low", "Medium", "High"]
+
+
+def get_interpretation(risk_level, qchat_score):
+    """Referral interpretation shown with (and sent to the LLM for) a result"""
+    if risk_level == "High":
+        return f"Score {qchat_score}/10: Significant autism characteristics. Professional evaluation strongly recommended."
+    elif risk_level == "Medium":
+        return f"Score {qchat_score}/10: Some autism characteristics. Professional consultation recommended."
+    else:
+        return f"Score {qchat_score}/10: Lower autism characteristics. Monitor development."
+
+
+# Representative payloads used to warm the model up at startup
+WARMUP_PAYLOADS = [
+    {"age_mons": 24, "gender": "male", "jaundice": "no", "family_mem_with_asd": "no",
+     "qchat_answers": {i: "A" for i in range(1, 11)}},
+    {"age_mons": 30, "gender": "female", "jaundice": "yes", "family_mem_with_asd": "yes",
+     "qchat_answers": {i: "E" for i in range(1, 11)}},
+    {"age_mons": 18, "gender": "male", "jaundice": "no", "family_mem_with_asd": "yes",
+     "qchat_answers": {i: ("A" if i % 2 else "C") for i in range(1, 11)}},
+]
+
+# Holds the serving predictor; loads it once under a lock and hot-swaps it on reload
+_manager = ModelManager(AutismPredictor, canary_payload=WARMUP_PAYLOADS[0])
+_ready = threading.Event()
+_load_error = None
+
+
+_registry = None
+_registry_lock = threading.Lock()
 
 
-_predictor = None
+def get_registry():
+    """Shadow-scoring registry, loaded on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(
+                    MODELS_DIR, SHADOW_MODELS, FEATURE_COLUMNS,
+                    max_workers=SHADOW_WORKERS, max_pending=SHADOW_MAX_PENDING
+                )
+    return _registry
+
+
+def get_model_manager():
+    return _manager
 
 
 def get_predictor():
-    global _predictor
-    if _predictor is None:
-        _predictor = AutismPredictor()
-    return _predictor
+    return _manager.current()
+
+
+def model_version():
+    """Version of the serving model, or None if it has not been loaded yet"""
+    return _manager.version
+
+
+def prediction_cache_info():
+    """Prediction cache counters of the serving model, or None if it has not been loaded yet"""
+    predictor = _manager.loaded()
+    return predictor.cache_info() if predictor is not None else None
+
+
+def reload_model(reason="manual"):
+    return _manager.reload(reason=reason)
+
+
+def start_model_watcher(interval=None):
+    _manager.start_watcher(MODEL_WATCH_INTERVAL if interval is None else interval)
+
+
+def init_predictor():
+    """Load the model once and warm it up; the predictor is ready after this returns"""
+    global _load_error
+    try:
+        predictor = get_predictor()
+        predictor.warm_up()
+        get_registry()
+    except Exception as e:
+        _load_error = str(e)
+        raise
+    _load_error = None
+    _ready.set()
+    return predictor
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def readiness():
+    """Readiness state for the /ready endpoint"""
+    if _ready.is_set():
+        return {"ready": True, "status": "ready"}
+    if _load_error:
+        return {"ready": False, "status": "failed", "error": _load_error}
+    return {"ready": False, "status": "loading"}
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Process-wide prediction batcher, created on first use"""
+    global _batcher
+    if _batcher is None:
+        # One batcher per process: two would split concurrent requests into separate batches
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = PredictionBatcher(
+                    lambda records: get_predictor().predict_batch(records),
+                    window_ms=PREDICT_BATCH_WINDOW_MS,
+                    max_batch=PREDICT_BATCH_SIZE
+                )
+    return _batcher
 
 
 def predict_autism_risk(data):
+    if PREDICT_BATCH_WINDOW_MS > 0:
+        return get_batcher().predict(data)
     predictor = get_predictor()
     return predictor.predict(data)
+
+
+def predict_autism_risk_batch(records):
+    predictor = get_predictor()
+    return predictor.predict_batch(records)
@@ -0,0 +1,318 @@
+"""
+Background Jobs
+
+Slow work (LLM reports, PDF rendering) runs on a thread pool per job kind, so
+it neither blocks request threads nor competes with prediction traffic, and
+each kind can be sized on its own. Callers get a job_id right away and poll
+the job's status; finished jobs are kept for JOB_RESULT_TTL seconds.
+
+With JOB_QUEUE_DIR set every job is also written to that directory as JSON.
+Status can then be polled from any worker on the host, and jobs that were
+queued or running when their process died are picked up again by the next
+process that starts (each process holds a lock file while alive, so a job is
+only taken over once its owner is gone).
+
+Job handlers take the job's params (JSON) and return a JSON-serializable result.
+
+Environment configuration:
+    JOB_<KIND>_WORKERS  threads for one kind, e.g. JOB_REPORT_WORKERS (default per register())
+    JOB_MAX_PENDING     queued + running jobs per kind before submit() refuses (default 1000)
+    JOB_RESULT_TTL      seconds finished jobs stay retrievable (default 3600)
+    JOB_QUEUE_DIR       directory for the disk-backed queue (default: memory only)
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no takeover of other processes' jobs
+    fcntl = None
+
+# Seconds between sweeps of expired jobs
+PURGE_INTERVAL = 60
+
+
+class JobQueueFull(Exception):
+    """Too many pending jobs of one kind"""
+
+
+class JobQueue:
+    """Per-kind thread pools with job IDs, status tracking, expiry and optional disk persistence"""
+
+    def __init__(self, max_pending=1000, ttl=3600, queue_dir=None):
+        self.max_pending = max(int(max_pending), 1)
+        self.ttl = ttl
+        self.queue_dir = Path(queue_dir) if queue_dir else None
+        self._handlers = {}
+        self._workers = {}
+        self._persist = {}
+        self._executors = {}
+        self._jobs = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._owner = None
+        self._owner_lock_file = None
+        self._last_purge = time.monotonic()
+        self.submitted = 0
+        self.rejected = 0
+        self.recovered = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_pending=int(os.getenv("JOB_MAX_PENDING", "1000")),
+            ttl=float(os.getenv("JOB_RESULT_TTL", "3600")),
+            queue_dir=os.getenv("JOB_QUEUE_DIR") or None,
+        )
+
+    def register(self, kind, handler, workers=2, persist=True):
+        """Route jobs of this kind to handler(params) on their own pool (persist=False: never written to disk)"""
+        self._handlers[kind] = handler
+        self._workers[kind] = int(os.getenv(f"JOB_{kind.upper()}_WORKERS", str(workers)))
+        self._persist[kind] = persist
+        self._pending.setdefault(kind, 0)
+
+    def _ensure_process(self):
+        # Pools, ownership and recovery are per process (threads and flocks must not cross a fork)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._executors = {}
+            self._pending = {kind: 0 for kind in self._handlers}
+            self._owner = uuid.uuid4().hex
+            self._pid = os.getpid()
+            if self.queue_dir is not None:
+                (self.queue_dir / "owners").mkdir(parents=True, exist_ok=True)
+                if fcntl is not None:
+                    self._owner_lock_file = open(str(self._owner_path(self._owner)), "w")
+                    fcntl.flock(self._owner_lock_file.fileno(), fcntl.LOCK_EX)
+        if self.queue_dir is not None:
+            self.recover()
+
+    def start(self):
+        """Create this process's pools and take over orphaned jobs (call in every worker)"""
+        self._ensure_process()
+
+    def _owner_path(self, owner):
+        return self.queue_dir / "owners" / f"{owner}.lock"
+
+    def _job_path(self, job_id):
+        return self.queue_dir / f"{job_id}.json"
+
+    def _save(self, job):
+        if self.queue_dir is None or not self._persist.get(job["kind"], True):
+            return
+        fd, tmp = tempfile.mkstemp(dir=str(self.queue_dir), prefix=".job-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(job, f, default=str)
+            os.replace(tmp, str(self._job_path(job["job_id"])))
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _load(self, job_id):
+        if self.queue_dir is None or not job_id.isalnum():
+            return None
+        try:
+            with open(str(self._job_path(job_id))) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def submit(self, kind, params):
+        """Queue a job and return its job_id (raises JobQueueFull when the kind is backed up)"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self._ensure_process()
+        self._maybe_purge()
+        with self._lock:
+            if self._pending[kind] >= self.max_pending:
+                self.rejected += 1
+                raise JobQueueFull(f"Too many pending {kind} jobs ({self.max_pending})")
+            self._pending[kind] += 1
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "params": params,
+            "owner": self._owner,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "result": None,
+            "error": None,
+        }
+        try:
+            self._start(job)
+        except Exception:
+            with self._lock:
+                self._pending[kind] -= 1
+            raise
+        self.submitted += 1
+        return job["job_id"]
+
+    def _start(self, job):
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+        self._save(job)
+        self._executor(job["kind"]).submit(self._run, job)
+
+    def _executor(self, kind):
+        with self._lock:
+            executor = self._executors.get(kind)
+            if executor is None:
+                executor = self._executors[kind] = ThreadPoolExecutor(
+                    max_workers=max(self._workers[kind], 1), thread_name_prefix=f"job-{kind}"
+                )
+            return executor
+
+    def _run(self, job):
+        try:
+            job["status"] = "running"
+            job["started"] = time.time()
+            self._save(job)
+            job["result"] = self._handlers[job["kind"]](job["params"])
+            job["status"] = "succeeded"
+        except Exception as e:
+            print(f"[Jobs] ❌ {job['kind']} job {job['job_id']} failed: {e}")
+            traceback.print_exc()
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished"] = time.time()
+            with self._lock:
+                self._pending[job["kind"]] -= 1
+            try:
+                self._save(job)
+            except Exception as e:
+                print(f"[Jobs] Warning: failed to persist job {job['job_id']}: {e}")
+
+    def get(self, job_id):
+        """Public view of a job (without its params) or None if unknown or expired"""
+        self._ensure_process()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            job = self._load(job_id)  # submitted by another worker
+        if job is None or self._expired(job):
+            return None
+        return {key: value for key, value in job.items() if key not in ("params", "owner")}
+
+    def _expired(self, job):
+        return bool(self.ttl) and job.get("finished") is not None and time.time() - job["finished"] > self.ttl
+
+    def _maybe_purge(self):
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        self.purge_expired()
+
+    def purge_expired(self):
+        """Forget finished jobs older than the TTL (memory and disk). Returns the number removed."""
+        with self._lock:
+            stale = [job_id for job_id, job in self._jobs.items() if self._expired(job)]
+            for job_id in stale:
+                del self._jobs[job_id]
+        removed = len(stale)
+        if self.queue_dir is not None:
+            for path in self.queue_dir.glob("*.json"):
+                try:
+                    with open(str(path)) as f:
+                        job = json.load(f)
+                    if self._expired(job):
+                        path.unlink()
+                        removed += job["job_id"] not in stale
+                except (OSError, ValueError, KeyError):
+                    continue
+        return removed
+
+    def _owner_alive(self, owner):
+        """An owner is alive while its process holds the flock on its lock file"""
+        if owner == self._owner:
+            return True
+        if fcntl is None:
+            return False
+        path = self._owner_path(owner)
+        try:
+            with open(str(path), "a") as f:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return True
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            return False
+        path.unlink()
+        return False
+
+    def recover(self):
+        """Take over queued/running jobs whose process has died and run them again"""
+        if self.queue_dir is None:
+            return 0
+        recover_lock = open(str(self.queue_dir / ".recover.lock"), "a")
+        try:
+            if fcntl is not None:
+                fcntl.flock(recover_lock.fileno(), fcntl.LOCK_EX)
+            recovered = 0
+            for path in sorted(self.queue_dir.glob("*.json")):
+                try:
+                    with open(str(path)) as f:
+                        job = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if job.get("status") not in ("queued", "running") or job.get("kind") not in self._handlers:
+                    continue
+                if self._owner_alive(job.get("owner")):
+                    continue
+                job.update(status="queued", owner=self._owner, started=None)
+                with self._lock:
+                    self._pending[job["kind"]] += 1
+                self._start(job)
+                recovered += 1
+            if recovered:
+                self.recovered += recovered
+                print(f"[Jobs] ✓ Recovered {recovered} unfinished jobs from {self.queue_dir}")
+            return recovered
+        finally:
+            if fcntl is not None:
+                fcntl.flock(recover_lock.fileno(), fcntl.LOCK_UN)
+            recover_lock.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": dict(self._pending),
+                "workers": dict(self._workers),
+                "tracked": len(self._jobs),
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "recovered": self.recovered,
+                "queue_dir": str(self.queue_dir) if self.queue_dir else None,
+            }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide job queue, configured from the environment on first use"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue.from_env()
+    return _queue
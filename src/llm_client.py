@@ -0,0 +1,399 @@
+"""
+Resilient LLM client
+
+Wraps the Groq SDK with:
+  - pooled HTTP connections (one httpx client per process, keep-alive)
+  - a per-attempt timeout and an overall deadline per report
+  - retries with exponential backoff and full jitter for transient errors
+    (timeouts, connection errors, 429 and 5xx)
+  - a concurrency limit: callers wait at most LLM_QUEUE_TIMEOUT for a slot
+  - a circuit breaker: after LLM_BREAKER_FAILURES consecutive failures calls
+    fail immediately for LLM_BREAKER_RESET seconds, then one trial call is let
+    through (half-open) and decides whether the breaker closes again
+
+Every failure raises LLMUnavailable (or the SDK error), so callers can fall
+back to the template report without waiting on a struggling upstream.
+
+Environment configuration:
+    LLM_TIMEOUT            seconds per attempt (default 15)
+    LLM_CONNECT_TIMEOUT    seconds to connect (default 3)
+    LLM_DEADLINE           seconds for all attempts of one call (default 25)
+    LLM_MAX_RETRIES        retries after the first attempt (default 2)
+    LLM_BACKOFF_BASE       first backoff in seconds, doubled per retry (default 0.5)
+    LLM_BACKOFF_MAX        backoff cap in seconds (default 4)
+    LLM_MAX_CONCURRENCY    concurrent upstream calls per process (default 8)
+    LLM_QUEUE_TIMEOUT      seconds to wait for a free slot (default 2)
+    LLM_MAX_CONNECTIONS    pooled connections per process (default 16)
+    LLM_BREAKER_FAILURES   consecutive failures that open the breaker (default 5)
+    LLM_BREAKER_RESET      seconds the breaker stays open (default 30)
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+try:
+    import httpx
+    import groq
+    from groq import Groq, AsyncGroq
+    HAS_GROQ = True
+except ImportError:
+    HAS_GROQ = False
+
+
+class LLMUnavailable(Exception):
+    """The LLM was not called (breaker open, no free slot) or every attempt failed"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed/open"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = max(int(failure_threshold), 1)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def available(self):
+        """Cheap pre-check: False while open and not yet due for a trial call"""
+        with self._lock:
+            return self.state != "open" or time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def allow(self):
+        """True if a call may go upstream now (in half-open state only one trial call)"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half-open"
+            if self.state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                print("[LLM] ✓ Circuit breaker closed")
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                    print(f"[LLM] ❌ Circuit breaker open for {self.reset_timeout:.0f}s after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def abandon(self):
+        """End a call without a verdict (cancelled, interrupted): a half-open trial slot is freed"""
+        with self._lock:
+            if self.state == "half-open":
+                self._trial_in_flight = False
+
+    def status(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+def _is_retryable(error):
+    if not HAS_GROQ:
+        return False
+    if isinstance(error, (groq.APITimeoutError, groq.APIConnectionError, groq.RateLimitError)):
+        return True
+    return isinstance(error, groq.APIStatusError) and error.status_code >= 500
+
+
+class LLMClient:
+    """Chat completions with pooling, deadlines, jittered retries, a concurrency cap and a breaker"""
+
+    def __init__(self, api_key, model_name, timeout=15.0, connect_timeout=3.0, deadline=25.0,
+                 max_retries=2, backoff_base=0.5, backoff_max=4.0, max_concurrency=8,
+                 queue_timeout=2.0, max_connections=16, breaker_failures=5, breaker_reset=30.0):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.deadline = deadline
+        self.max_retries = max(int(max_retries), 0)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.queue_timeout = queue_timeout
+        self.max_connections = max(int(max_connections), 1)
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._async_slots = {}
+        self._client = None
+        self._async_client = None
+        self._client_pid = None
+        self._client_lock = threading.Lock()
+
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+
+    @classmethod
+    def from_env(cls, api_key, model_name):
+        return cls(
+            api_key, model_name,
+            timeout=float(os.getenv("LLM_TIMEOUT", "15")),
+            connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", "3")),
+            deadline=float(os.getenv("LLM_DEADLINE", "25")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            backoff_base=float(os.getenv("LLM_BACKOFF_BASE", "0.5")),
+            backoff_max=float(os.getenv("LLM_BACKOFF_MAX", "4")),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "2")),
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "16")),
+            breaker_failures=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            breaker_reset=float(os.getenv("LLM_BREAKER_RESET", "30")),
+        )
+
+    def _ensure_clients(self):
+        # Created per process: pooled sockets must not be shared across a pre-fork
+        if self._client is not None and self._client_pid == os.getpid():
+            return
+        with self._client_lock:
+            if self._client is not None and self._client_pid == os.getpid():
+                return
+            timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=self.max_connections)
+            # Retries are done here (with jitter and a deadline), not by the SDK
+            self._client = Groq(api_key=self.api_key, timeout=timeout, max_retries=0,
+                                http_client=httpx.Client(timeout=timeout, limits=limits))
+            self._async_client = AsyncGroq(api_key=self.api_key, timeout=timeout, max_retries=0,
+                                           http_client=httpx.AsyncClient(timeout=timeout, limits=limits))
+            self._async_slots = {}
+            self._client_pid = os.getpid()
+
+    @property
+    def client(self):
+        self._ensure_clients()
+        return self._client
+
+    @property
+    def async_client(self):
+        self._ensure_clients()
+        return self._async_client
+
+    def available(self):
+        """False while the breaker is open (callers should use their fallback right away)"""
+        return self.breaker.available()
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _request(self, prompt, max_tokens, timeout):
+        return {
+            "model": self.model_name,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": prompt}],
+            "timeout": timeout,
+        }
+
+    def complete(self, prompt, max_tokens=300):
+        """Return the completion text or raise (LLMUnavailable when the call was not possible)"""
+        if not self.available():
+            raise LLMUnavailable("circuit breaker open")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMUnavailable(f"no free LLM slot within {self.queue_timeout}s")
+        try:
+            if not self.breaker.allow():
+                raise LLMUnavailable("circuit breaker open")
+            return self._with_retries(lambda timeout: self._call(prompt, max_tokens, timeout), time.sleep)
+        finally:
+            self._slots.release()
+
+    def _call(self, prompt, max_tokens, timeout):
+        completion = self.client.chat.completions.create(**self._request(prompt, max_tokens, timeout))
+        return completion.choices[0].message.content
+
+    def _with_retries(self, attempt_fn, sleep):
+        try:
+            return self._retry_loop(attempt_fn, sleep)
+        except BaseException:
+            # Upstream errors were already recorded by the loop, which leaves no trial
+            # in flight, so this only matters for an interrupt: a half-open trial must
+            # not leave the breaker waiting for its verdict
+            self.breaker.abandon()
+            raise
+
+    def _retry_loop(self, attempt_fn, sleep):
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            self.calls += 1
+            remaining = deadline - time.monotonic()
+            try:
+                text = attempt_fn(min(self.timeout, max(remaining, 0.1)))
+                self.breaker.record_success()
+                return text
+            except Exception as e:
+                self.failures += 1
+                delay = self._backoff(attempt)
+                if not _is_retryable(e) or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self.breaker.record_failure()
+                    raise
+                attempt += 1
+                self.retries += 1
+                print(f"[LLM] Retry {attempt}/{self.max_retries} in {delay:.2f}s after: {e}")
+                sleep(delay)
+
+    async def acomplete(self, prompt, max_tokens=300):
+        """Async variant of complete()"""
+        if not self.available():
+            raise LLMUnavailable("circuit breaker open")
+        slots = self._loop_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise LLMUnavailable(f"no free LLM slot within {self.queue_timeout}s")
+        try:
+            if not self.breaker.allow():
+                raise LLMUnavailable("circuit breaker open")
+            completion = await self._awith_retries(prompt, max_tokens)
+            return completion.choices[0].message.content
+        finally:
+            slots.release()
+
+    def _loop_slots(self):
+        # asyncio semaphores belong to one event loop
+        self._ensure_clients()
+        loop = asyncio.get_running_loop()
+        slots = self._async_slots.get(loop)
+        if slots is None:
+            slots = self._async_slots[loop] = asyncio.Semaphore(self.max_concurrency)
+        return slots
+
+    async def _awith_retries(self, prompt, max_tokens, stream=False):
+        try:
+            return await self._aretry_loop(prompt, max_tokens, stream)
+        except BaseException:
+            # As in _with_retries: only a cancellation (e.g. the client disconnected)
+            # leaves a half-open trial without a verdict
+            self.breaker.abandon()
+            raise
+
+    async def _aretry_loop(self, prompt, max_tokens, stream):
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            self.calls += 1
+            remaining = deadline - time.monotonic()
+            try:
+                completion = await self.async_client.chat.completions.create(
+                    stream=stream, **self._request(prompt, max_tokens, min(self.timeout, max(remaining, 0.1)))
+                )
+                self.breaker.record_success()
+                return completion
+            except Exception as e:
+                self.failures += 1
+                delay = self._backoff(attempt)
+                if not _is_retryable(e) or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self.breaker.record_failure()
+                    raise
+                attempt += 1
+                self.retries += 1
+                print(f"[LLM] Retry {attempt}/{self.max_retries} in {delay:.2f}s after: {e}")
+                await asyncio.sleep(delay)
+
+    def stream(self, prompt, max_tokens=300):
+        """Yield completion text as it arrives. Only opening the stream is retried."""
+        if not self.available():
+            raise LLMUnavailable("circuit breaker open")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMUnavailable(f"no free LLM slot within {self.queue_timeout}s")
+        try:
+            if not self.breaker.allow():
+                raise LLMUnavailable("circuit breaker open")
+            deadline = time.monotonic() + self.deadline
+            chunks = self._with_retries(
+                lambda timeout: self.client.chat.completions.create(
+                    stream=True, **self._request(prompt, max_tokens, timeout)
+                ),
+                time.sleep,
+            )
+            try:
+                for chunk in chunks:
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        yield text
+                    if time.monotonic() > deadline:
+                        raise LLMUnavailable(f"LLM stream exceeded {self.deadline}s deadline")
+            except GeneratorExit:
+                raise  # the client went away; not an upstream failure
+            except Exception:
+                self.failures += 1
+                self.breaker.record_failure()
+                raise
+            finally:
+                response = getattr(chunks, "response", None)
+                if response is not None:
+                    response.close()
+        finally:
+            self._slots.release()
+
+    async def astream(self, prompt, max_tokens=300):
+        """Async variant of stream()"""
+        if not self.available():
+            raise LLMUnavailable("circuit breaker open")
+        slots = self._loop_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise LLMUnavailable(f"no free LLM slot within {self.queue_timeout}s")
+        try:
+            if not self.breaker.allow():
+                raise LLMUnavailable("circuit breaker open")
+            deadline = time.monotonic() + self.deadline
+            chunks = await self._awith_retries(prompt, max_tokens, stream=True)
+            try:
+                async for chunk in chunks:
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        yield text
+                    if time.monotonic() > deadline:
+                        raise LLMUnavailable(f"LLM stream exceeded {self.deadline}s deadline")
+            except GeneratorExit:
+                raise
+            except Exception:
+                self.failures += 1
+                self.breaker.record_failure()
+                raise
+            finally:
+                response = getattr(chunks, "response", None)
+                if response is not None:
+                    await response.aclose()
+        finally:
+            slots.release()
+
+    def stats(self):
+        return {
+            "model": self.model_name,
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "max_concurrency": self.max_concurrency,
+            "breaker": self.breaker.status(),
+        }
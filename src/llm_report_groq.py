@@ -2,16 +2,24 @@
 LLM Report Generation using Groq API
 """
 
+import asyncio
 import os
+import threading
 from dotenv import load_dotenv
 
+from src.llm_client import HAS_GROQ, LLMClient
+from src.report_cache import get_report_cache, report_cache_key
+from src.singleflight import SingleFlight, AsyncSingleFlight
+
 load_dotenv()
 
-try:
-    from groq import Groq
-    HAS_GROQ = True
-except ImportError:
-    HAS_GROQ = False
+GROQ_MODEL = os.getenv("GROQ_MODEL", "mixtral-8x7b-32768")
+
+# Streamed when the LLM stream breaks after some text was already sent
+STREAM_INTERRUPTED_NOTICE = "\n\n[The generated report was interrupted. The standard report follows.]\n\n"
+
+# Part of the report cache key: bump whenever _build_prompt or the LLM call parameters change
+PROMPT_VERSION = "1"
 
 
 class ReportGenerator:
@@ -19,45 +27,169 @@ class ReportGenerator:
     
     def __init__(self):
         self.api_key = os.getenv("GROQ_API_KEY")
-        self.client = None
+        self.model_name = GROQ_MODEL
+        # Pooled Groq client with timeouts, retries, a concurrency cap and a circuit breaker
+        self.llm = None
+        # Identical prompts requested at the same time share one LLM call
+        self.inflight = SingleFlight()
+        self.ainflight = AsyncSingleFlight()
         
         if HAS_GROQ and self.api_key:
             try:
-                self.client = Groq(api_key=self.api_key)
+                self.llm = LLMClient.from_env(self.api_key, self.model_name)
             except Exception as e:
                 print(f"Groq initialization warning: {e}")
     
     def generate_report(self, prediction_result):
         """Generate detailed report from prediction results"""
-        if self.client:
+        if self.llm:
+            key = self._cache_key(prediction_result)
+            cached = self._cached_report(key)
+            if cached is not None:
+                return cached
+            if not self.llm.available():
+                # Upstream is failing: skip straight to the template instead of waiting on it
+                return self._generate_template_report(prediction_result)
             try:
-                return self._generate_with_llm(prediction_result)
+                return self.inflight.do(key, self._generate_and_store, prediction_result, key)
             except Exception as e:
                 print(f"LLM generation failed: {e}")
                 return self._generate_template_report(prediction_result)
         else:
             return self._generate_template_report(prediction_result)
     
-    def _generate_with_llm(self, result):
-        """Generate report using Groq LLM"""
+    async def agenerate_report(self, prediction_result):
+        """Async variant of generate_report: the LLM call is awaited instead of blocking a thread"""
+        if self.llm:
+            key = self._cache_key(prediction_result)
+            cached = await asyncio.to_thread(self._cached_report, key)  # SQLite: off the event loop
+            if cached is not None:
+                return cached
+            if not self.llm.available():
+                return self._generate_template_report(prediction_result)
+            try:
+                return await self.ainflight.do(key, self._agenerate_and_store, prediction_result, key)
+            except Exception as e:
+                print(f"LLM generation failed: {e}")
+                return self._generate_template_report(prediction_result)
+        else:
+            return self._generate_template_report(prediction_result)
+    
+    def _generate_and_store(self, prediction_result, key):
+        report = self._generate_with_llm(prediction_result)
+        self._store_report(key, report)
+        return report
+    
+    async def _agenerate_and_store(self, prediction_result, key):
+        report = await self._agenerate_with_llm(prediction_result)
+        await asyncio.to_thread(self._store_report, key, report)
+        return report
+    
+    def stream_report(self, prediction_result):
+        """Yield the report in chunks as the LLM writes it (the template fallback is streamed too)"""
+        if self.llm:
+            key = self._cache_key(prediction_result)
+            cached = self._cached_report(key)
+            if cached is not None:
+                yield cached
+                return
+            if self.llm.available():
+                parts = []
+                try:
+                    for text in self.llm.stream(self._build_prompt(prediction_result), max_tokens=300):
+                        parts.append(text)
+                        yield text
+                    self._store_report(key, "".join(parts))
+                    return
+                except Exception as e:
+                    print(f"LLM streaming failed: {e}")
+                    if parts:
+                        yield STREAM_INTERRUPTED_NOTICE
+        yield from self._stream_template_report(prediction_result)
+    
+    async def astream_report(self, prediction_result):
+        """Async variant of stream_report"""
+        if self.llm:
+            key = self._cache_key(prediction_result)
+            cached = await asyncio.to_thread(self._cached_report, key)
+            if cached is not None:
+                yield cached
+                return
+            if self.llm.available():
+                parts = []
+                try:
+                    async for text in self.llm.astream(self._build_prompt(prediction_result), max_tokens=300):
+                        parts.append(text)
+                        yield text
+                    await asyncio.to_thread(self._store_report, key, "".join(parts))
+                    return
+                except Exception as e:
+                    print(f"LLM streaming failed: {e}")
+                    if parts:
+                        yield STREAM_INTERRUPTED_NOTICE
+        for line in self._stream_template_report(prediction_result):
+            yield line
+    
+    def _stream_template_report(self, result):
+        for line in self._generate_template_report(result).splitlines(keepends=True):
+            yield line
+    
+    def warm_cache_entry(self, prediction_result, refresh=False):
+        """Make sure the LLM report for this result is cached. Returns "cached" or "generated"."""
+        if not self.llm:
+            raise RuntimeError("Groq client not configured (GROQ_API_KEY)")
+        key = self._cache_key(prediction_result)
+        if not refresh and self._cached_report(key) is not None:
+            return "cached"
+        self._store_report(key, self._generate_with_llm(prediction_result))
+        return "generated"
+    
+    def _cache_key(self, result):
+        return report_cache_key(self._build_prompt(result), self.model_name, PROMPT_VERSION)
+    
+    def _cached_report(self, key):
+        cache = get_report_cache()
+        if cache is None:
+            return None
         try:
-            risk = result.get("qchat_risk_level")
-            score = result.get("qchat_score")
-            interp = result.get("qchat_referral_interpretation")
-            
-            prompt = f"""Write a brief clinical assessment report for an autism screening with:
+            return cache.get(key)
+        except Exception as e:
+            print(f"[LLM] Report cache read failed: {e}")
+            return None
+    
+    def _store_report(self, key, report):
+        cache = get_report_cache()
+        if cache is None or not report:
+            return
+        try:
+            cache.put(key, report, model_name=self.model_name, prompt_version=PROMPT_VERSION)
+        except Exception as e:
+            print(f"[LLM] Report cache write failed: {e}")
+    
+    def _build_prompt(self, result):
+        risk = result.get("qchat_risk_level")
+        score = result.get("qchat_score")
+        interp = result.get("qchat_referral_interpretation")
+        
+        return f"""Write a brief clinical assessment report for an autism screening with:
 - Q-CHAT Score: {score}/10
 - Risk Level: {risk}
 - Interpretation: {interp}
 
 Keep it under 200 words and professional."""
-            
-            message = self.client.messages.create(
-                model="mixtral-8x7b-32768",
-                max_tokens=300,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return message.content[0].text
+    
+    def _generate_with_llm(self, result):
+        """Generate report using Groq LLM"""
+        try:
+            return self.llm.complete(self._build_prompt(result), max_tokens=300)
+        except Exception as e:
+            print(f"[LLM] Error with Groq API: {e}")
+            raise
+    
+    async def _agenerate_with_llm(self, result):
+        """Generate report using the async Groq client"""
+        try:
+            return await self.llm.acomplete(self._build_prompt(result), max_tokens=300)
         except Exception as e:
             print(f"[LLM] Error with Groq API: {e}")
             raise
@@ -105,15 +237,35 @@ Always consult with your healthcare provider for comprehensive assessment."""
 
 
 _generator = None
+_generator_lock = threading.Lock()
 
 
 def get_generator():
     global _generator
     if _generator is None:
-        _generator = ReportGenerator()
+        # One generator per process, so all callers share its single-flight groups
+        with _generator_lock:
+            if _generator is None:
+                _generator = ReportGenerator()
     return _generator
 
 
 def generate_risk_report(prediction_result):
     generator = get_generator()
     return generator.generate_report(prediction_result)
+
+
+async def agenerate_risk_report(prediction_result):
+    generator = get_generator()
+    return await generator.agenerate_report(prediction_result)
+
+
+def stream_risk_report(prediction_result):
+    """Streaming variant of generate_risk_report: yields report text chunks"""
+    generator = get_generator()
+    return generator.stream_report(prediction_result)
+
+
+def astream_risk_report(prediction_result):
+    generator = get_generator()
+    return generator.astream_report(prediction_result)
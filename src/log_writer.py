@@ -0,0 +1,333 @@
+"""
+Asynchronous JSON-lines log writer
+
+Request threads only serialize the record and put it on a bounded queue; a
+background thread writes queued lines in batches, rotates the file by size
+and/or age (gzip-compressing old files) and fsyncs according to the policy.
+A batch that would cross LOG_MAX_BYTES is split, so the file is rotated
+between lines instead of overshooting the limit.
+
+Several processes (pre-fork workers) may share one log file: rotation happens
+under a lock file and every writer reopens the file once it has been rotated.
+The time a file was started is kept in a "<name>.created" file next to it
+(written by whichever writer creates the log), so its age does not depend on
+the last write.
+
+Environment configuration (see AsyncLogWriter.from_env):
+    LOG_QUEUE_SIZE       max queued lines (default 10000)
+    LOG_QUEUE_FULL       "drop" (default) or "block" when the queue is full
+    LOG_BLOCK_TIMEOUT    max seconds to block before dropping (default 0.05)
+    LOG_BATCH_SIZE       max lines per write (default 256)
+    LOG_FLUSH_INTERVAL   max seconds a line waits before being written (default 0.5)
+    LOG_MAX_BYTES        rotate when the file would exceed this size (default 10 MB, 0 = never)
+    LOG_ROTATE_SECONDS   rotate files older than this (default 86400, 0 = never)
+    LOG_BACKUP_COUNT     rotated files kept (default 5)
+    LOG_COMPRESS         gzip rotated files (default 1)
+    LOG_FSYNC            "never" (default), "batch" or "interval"
+    LOG_FSYNC_INTERVAL   seconds between fsyncs for "interval" (default 5)
+"""
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+# Seconds to let other processes notice a rotation before the rotated file is compressed
+ROTATE_GRACE_SECONDS = 0.2
+
+
+class AsyncLogWriter:
+    """Bounded-queue, batched, rotating JSON-lines writer"""
+
+    def __init__(self, path, max_queue=10000, full_policy="drop", block_timeout=0.05,
+                 batch_size=256, flush_interval=0.5, max_bytes=10 * 1024 * 1024,
+                 rotate_seconds=86400, backup_count=5, compress=True,
+                 fsync="never", fsync_interval=5.0):
+        if full_policy not in ("drop", "block"):
+            raise ValueError(f"full_policy must be 'drop' or 'block', got {full_policy}")
+        if fsync not in ("never", "batch", "interval"):
+            raise ValueError(f"fsync must be 'never', 'batch' or 'interval', got {fsync}")
+
+        self.path = Path(path)
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+        self.batch_size = max(int(batch_size), 1)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.compress = compress
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+
+        self._queue = queue.Queue(maxsize=max(int(max_queue), 1))
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._inode = None
+        self._created_at = None
+        self._last_fsync = 0.0
+
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+
+    @classmethod
+    def from_env(cls, path):
+        return cls(
+            path,
+            max_queue=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            full_policy=os.getenv("LOG_QUEUE_FULL", "drop").lower(),
+            block_timeout=float(os.getenv("LOG_BLOCK_TIMEOUT", "0.05")),
+            batch_size=int(os.getenv("LOG_BATCH_SIZE", "256")),
+            flush_interval=float(os.getenv("LOG_FLUSH_INTERVAL", "0.5")),
+            max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            rotate_seconds=float(os.getenv("LOG_ROTATE_SECONDS", "86400")),
+            backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+            compress=os.getenv("LOG_COMPRESS", "1") != "0",
+            fsync=os.getenv("LOG_FSYNC", "never").lower(),
+            fsync_interval=float(os.getenv("LOG_FSYNC_INTERVAL", "5")),
+        )
+
+    def write(self, record):
+        """Queue one record. Returns False if it was dropped because the queue is full."""
+        # Serialize now so later changes to the caller's objects do not leak into the log
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        self._ensure_started()
+        try:
+            if self.full_policy == "block":
+                self._queue.put(line, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _ensure_started(self):
+        # Started on first write so a forking server never inherits a dead thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"log-writer:{self.path.name}", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            lines = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(lines) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    lines.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            stop = None in lines
+            self._write_batch([line for line in lines if line is not None])
+            if stop:
+                self._close_file()
+                return
+
+    def _write_batch(self, lines):
+        if not lines:
+            return
+        encoded = [line.encode("utf-8") for line in lines]
+        start = 0
+        try:
+            while start < len(encoded):
+                self._reopen_if_rotated()
+                self._maybe_rotate(len(encoded[start]))
+                end = self._lines_that_fit(encoded, start)
+                f = self._open()
+                f.write(b"".join(encoded[start:end]))
+                f.flush()
+                now = time.monotonic()
+                if self.fsync == "batch" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval):
+                    os.fsync(f.fileno())
+                    self._last_fsync = now
+                self.written += end - start
+                start = end
+        except Exception as e:
+            self.dropped += len(encoded) - start
+            print(f"[LogWriter] Warning: failed to write {self.path.name}: {e}")
+
+    def _lines_that_fit(self, encoded, start):
+        """End of the run of lines from start that keeps the file within max_bytes (at least one line)"""
+        if not self.max_bytes:
+            return len(encoded)
+        try:
+            room = self.max_bytes - self.path.stat().st_size
+        except OSError:
+            room = self.max_bytes
+        end = start + 1
+        room -= len(encoded[start])
+        while end < len(encoded) and len(encoded[end]) <= room:
+            room -= len(encoded[end])
+            end += 1
+        return end
+
+    def _open(self):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(str(self.path), "ab")
+            self._inode = os.fstat(self._file.fileno()).st_ino
+            self._created_at = self._creation_time()
+        return self._file
+
+    def _created_marker(self):
+        return self.path.with_name(self.path.name + ".created")
+
+    def _creation_time(self):
+        """When the current log file was started; the first writer to open it records the time"""
+        marker = self._created_marker()
+        try:
+            fd = os.open(str(marker), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            try:
+                return float(marker.read_text())
+            except (OSError, ValueError):
+                return time.time()  # being written by another process right now
+        now = time.time()
+        with os.fdopen(fd, "w") as f:
+            f.write(repr(now))
+        return now
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.flush()
+            if self.fsync != "never":
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def _reopen_if_rotated(self):
+        """Another process may have rotated the file; stop writing to the old inode"""
+        if self._file is None:
+            return
+        try:
+            current = self.path.stat().st_ino
+        except OSError:
+            current = None
+        if current != self._inode:
+            self._close_file()
+            self._created_at = None
+
+    def _needs_rotation(self, incoming):
+        if not self.path.exists():
+            return False
+        size = self.path.stat().st_size
+        if size == 0:
+            return False
+        too_big = self.max_bytes and size + incoming > self.max_bytes
+        if self._created_at is None:
+            self._created_at = self._creation_time()
+        too_old = self.rotate_seconds and time.time() - self._created_at > self.rotate_seconds
+        return bool(too_big or too_old)
+
+    def _maybe_rotate(self, incoming):
+        if not self._needs_rotation(incoming):
+            return
+        if fcntl is None:
+            self._rotate()
+            return
+        lock_path = self.path.with_name(self.path.name + ".lock")
+        with open(str(lock_path), "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                # Another process may have rotated while we waited for the lock
+                self._reopen_if_rotated()
+                if self._needs_rotation(incoming):
+                    self._rotate()
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _backup_name(self, index):
+        suffix = ".gz" if self.compress else ""
+        return self.path.with_name(f"{self.path.name}.{index}{suffix}")
+
+    def _rotate(self):
+        """predict_requests.log -> .1(.gz); .1 -> .2; ... oldest beyond backup_count is deleted"""
+        self._close_file()
+        # Dropped first, so the next file gets a fresh start time
+        try:
+            self._created_marker().unlink()
+        except FileNotFoundError:
+            pass
+        if self.backup_count <= 0:
+            self.path.unlink()
+        else:
+            oldest = self._backup_name(self.backup_count)
+            if oldest.exists():
+                oldest.unlink()
+            for index in range(self.backup_count - 1, 0, -1):
+                src = self._backup_name(index)
+                if src.exists():
+                    os.replace(str(src), str(self._backup_name(index + 1)))
+            if self.compress:
+                rotated = self.path.with_name(self.path.name + ".rotating")
+                os.replace(str(self.path), str(rotated))
+                if fcntl is not None:
+                    time.sleep(ROTATE_GRACE_SECONDS)
+                with open(str(rotated), "rb") as src, gzip.open(str(self._backup_name(1)), "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                rotated.unlink()
+            else:
+                os.replace(str(self.path), str(self._backup_name(1)))
+        self._created_at = None
+        self.rotations += 1
+
+    def close(self, timeout=5.0):
+        """Write everything still queued and close the file"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "path": str(self.path),
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+        }
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_log_writer(path):
+    """One shared writer per log file, configured from the environment"""
+    key = str(Path(path).resolve())
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = AsyncLogWriter.from_env(path)
+            _writers[key] = writer
+        return writer
+
+
+@atexit.register
+def close_all_writers():
+    """Flush and close every writer (called at exit and by the pre-fork server on worker exit)"""
+    for writer in list(_writers.values()):
+        writer.close()
@@ -0,0 +1,150 @@
+"""
+Model Manager
+
+Owns the serving predictor and swaps in a newly loaded one without downtime.
+A reload builds the new predictor off to the side, warms it up, checks it with
+a canary prediction and only then replaces the reference. Requests already
+holding the old predictor finish on it.
+"""
+
+import math
+import threading
+import time
+from datetime import datetime
+
+
+class ModelManager:
+    """Hot-reloadable holder for the current predictor"""
+
+    def __init__(self, loader, canary_payload):
+        # loader() -> predictor with .version, .warm_up(), .predict(data), .artifact_paths()
+        self.loader = loader
+        self.canary_payload = canary_payload
+        self._predictor = None
+        self._load_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._signature = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.last_reload_error = None
+
+    @property
+    def version(self):
+        predictor = self._predictor
+        return predictor.version if predictor is not None else None
+
+    def current(self):
+        """Return the serving predictor, loading it on first use"""
+        predictor = self._predictor
+        if predictor is None:
+            with self._load_lock:
+                if self._predictor is None:
+                    self._install(self.loader())
+                predictor = self._predictor
+        return predictor
+
+    def loaded(self):
+        """The serving predictor, or None if it has not been loaded yet (never loads it)"""
+        return self._predictor
+
+    def _install(self, predictor):
+        self._signature = self._artifact_signature(predictor)
+        self.loaded_at = datetime.utcnow().isoformat() + "Z"
+        # A single reference assignment: readers see either the old or the new predictor
+        self._predictor = predictor
+
+    def _artifact_signature(self, predictor):
+        signature = []
+        for path in predictor.artifact_paths():
+            try:
+                stat = path.stat()
+                signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((str(path), None, None))
+        return tuple(signature)
+
+    def _check_canary(self, predictor):
+        result = predictor.predict(self.canary_payload)
+        probability = result.get("model_probability_asd")
+        if probability is None or math.isnan(probability) or not 0.0 <= probability <= 1.0:
+            raise ValueError(f"Canary prediction returned an invalid probability: {probability}")
+        if result.get("qchat_risk_level") not in ("Low", "Medium", "High"):
+            raise ValueError(f"Canary prediction returned an invalid risk level: {result.get('qchat_risk_level')}")
+
+    def reload(self, reason="manual"):
+        """Load, warm up and canary-check new artifacts, then swap them in.
+
+        On failure the current predictor keeps serving and the error is raised.
+        """
+        with self._reload_lock:
+            previous = self.version
+            print(f"[ModelManager] Reloading model ({reason}), current version: {previous}")
+            try:
+                candidate = self.loader()
+                candidate.warm_up()
+                self._check_canary(candidate)
+            except Exception as e:
+                self.last_reload_error = str(e)
+                print(f"[ModelManager] ❌ Reload failed, keeping version {previous}: {e}")
+                raise
+
+            with self._load_lock:
+                self._install(candidate)
+            self.reloads += 1
+            self.last_reload_error = None
+            print(f"[ModelManager] ✓ Swapped model {previous} -> {candidate.version}")
+            return {"previous_version": previous, "model_version": candidate.version}
+
+    def reload_if_changed(self, reason="artifacts changed"):
+        """Reload if the artifacts on disk differ from the ones the serving model was loaded from.
+
+        Returns the swap details, or None when the model is current (or not loaded yet).
+        """
+        predictor = self._predictor
+        if predictor is None or self._artifact_signature(predictor) == self._signature:
+            return None
+        return self.reload(reason=reason)
+
+    def start_watcher(self, interval):
+        """Poll the model artifacts every `interval` seconds and reload when they change"""
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="model-watcher", daemon=True
+        )
+        self._watcher.start()
+        print(f"[ModelManager] Watching model artifacts every {interval}s")
+
+    def _watch(self, interval):
+        pending = None
+        while True:
+            time.sleep(interval)
+            try:
+                predictor = self._predictor
+                if predictor is None:
+                    continue
+                signature = self._artifact_signature(predictor)
+                if signature == self._signature:
+                    pending = None
+                    continue
+                # Wait until the files stop changing for one interval so a
+                # half-written model/threshold pair is never picked up
+                if signature != pending:
+                    pending = signature
+                    continue
+                pending = None
+                # Remember these files even if they fail, so a bad artifact is not retried every poll
+                self._signature = signature
+                self.reload(reason="artifacts changed")
+            except Exception as e:
+                print(f"[ModelManager] Watcher error: {e}")
+
+    def status(self):
+        return {
+            "model_version": self.version,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "last_reload_error": self.last_reload_error,
+            "watching": self._watcher is not None and self._watcher.is_alive(),
+        }
@@ -0,0 +1,172 @@
+"""
+Model Registry
+
+Loads candidate models next to the serving (primary) model and scores every
+request's features with them in shadow, on a background pool, so candidates
+can be compared against the primary under real traffic without affecting
+responses.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.numpy_model import NumpyModel
+
+# Latency samples / recent outputs kept per model
+STATS_WINDOW = 1000
+RECENT_OUTPUTS = 20
+
+
+def _risk_bands(proba, threshold):
+    """Same bands as AutismPredictor: High >= threshold, Medium >= 0.65 * threshold"""
+    return np.where(proba >= threshold, 2, np.where(proba >= threshold * 0.65, 1, 0))
+
+
+class ModelStats:
+    """Rolling latency and agreement statistics for one model"""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.rows = 0
+        self.errors = 0
+        self.last_error = None
+        self.latencies = deque(maxlen=STATS_WINDOW)
+        self.abs_diff_sum = 0.0
+        self.band_agreements = 0
+        self.recent = deque(maxlen=RECENT_OUTPUTS)
+        self._lock = threading.Lock()
+
+    def record_latency(self, seconds, n_rows):
+        with self._lock:
+            self.calls += 1
+            self.rows += n_rows
+            self.latencies.append(seconds)
+
+    def record_comparison(self, primary, shadow, threshold):
+        agree = _risk_bands(primary, threshold) == _risk_bands(shadow, threshold)
+        with self._lock:
+            self.abs_diff_sum += float(np.abs(primary - shadow).sum())
+            self.band_agreements += int(agree.sum())
+            for p, s in zip(primary[-RECENT_OUTPUTS:], shadow[-RECENT_OUTPUTS:]):
+                self.recent.append({"primary": float(p), "shadow": float(s)})
+
+    def record_error(self, error):
+        with self._lock:
+            self.errors += 1
+            self.last_error = str(error)
+
+    def snapshot(self, compared=False):
+        with self._lock:
+            latencies_ms = np.array(self.latencies) * 1000.0
+            stats = {
+                "calls": self.calls,
+                "rows": self.rows,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "latency_ms": {
+                    "mean": float(latencies_ms.mean()) if len(latencies_ms) else None,
+                    "p50": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+                    "p95": float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else None,
+                    "max": float(latencies_ms.max()) if len(latencies_ms) else None,
+                },
+            }
+            if compared:
+                stats["mean_abs_diff_vs_primary"] = (self.abs_diff_sum / self.rows) if self.rows else None
+                stats["risk_band_agreement"] = (self.band_agreements / self.rows) if self.rows else None
+                stats["recent"] = list(self.recent)
+            return stats
+
+
+class ModelRegistry:
+    """Primary latency tracking plus shadow scoring with named candidate models"""
+
+    def __init__(self, models_dir, shadow_names, feature_columns, max_workers=1, max_pending=256):
+        self.models_dir = models_dir
+        self.feature_columns = feature_columns
+        self.max_pending = max_pending
+        self.shadows = {}
+        self.stats = {}
+        self.primary_stats = None
+        self.dropped = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(int(max_workers), 1), thread_name_prefix="shadow")
+
+        for name in shadow_names:
+            try:
+                self.shadows[name] = self._load(models_dir / name)
+                self.stats[name] = ModelStats(name)
+                print(f"[Registry] ✓ Shadow model loaded: {name}")
+            except Exception as e:
+                print(f"[Registry] ❌ Failed to load shadow model {name}: {e}")
+
+    def _load(self, path):
+        if path.suffix == ".npz":
+            return NumpyModel(path)
+        import joblib
+        return joblib.load(str(path))
+
+    def _predict(self, model, rows):
+        if isinstance(model, NumpyModel):
+            return model.predict_proba(rows)[:, 1]
+        import pandas as pd
+        X = pd.DataFrame(rows, columns=self.feature_columns)
+        if hasattr(model, "predict_proba"):
+            return model.predict_proba(X)[:, 1]
+        return np.asarray(model.predict(X), dtype=float)
+
+    def record_primary(self, name, seconds, n_rows):
+        """Latency of one primary model call (table and cache hits are not timed)"""
+        with self._lock:
+            if self.primary_stats is None or self.primary_stats.name != name:
+                self.primary_stats = ModelStats(name)
+            stats = self.primary_stats
+        stats.record_latency(seconds, n_rows)
+
+    def submit(self, rows, primary_probabilities, threshold):
+        """Score rows with every shadow model in the background (dropped if the pool is backed up)"""
+        if not self.shadows:
+            return
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending += 1
+        try:
+            self._executor.submit(self._score, np.array(rows), np.array(primary_probabilities), threshold)
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+
+    def _score(self, rows, primary_probabilities, threshold):
+        try:
+            for name, model in self.shadows.items():
+                stats = self.stats[name]
+                try:
+                    start = time.perf_counter()
+                    shadow_probabilities = np.asarray(self._predict(model, rows), dtype=float)
+                    stats.record_latency(time.perf_counter() - start, len(rows))
+                    stats.record_comparison(primary_probabilities, shadow_probabilities, threshold)
+                except Exception as e:
+                    stats.record_error(e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def snapshot(self):
+        with self._lock:
+            primary = self.primary_stats
+        return {
+            "primary": {
+                "name": primary.name if primary else None,
+                **(primary.snapshot() if primary else {}),
+            },
+            "shadows": {name: stats.snapshot(compared=True) for name, stats in self.stats.items()},
+            "pending": self._pending,
+            "dropped": self.dropped,
+        }
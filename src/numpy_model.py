@@ -0,0 +1,91 @@
+"""
+Pure-NumPy Model Evaluator
+
+Evaluates models exported by autism-prescreening-tool/src/export_numpy_model.py
+without importing sklearn, pandas or xgboost.
+
+Artifact format (.npz):
+    kind            "linear" | "forest" | "gbtree"
+    feature_names   model input columns, in order
+    medians, mean, scale   SimpleImputer + StandardScaler parameters
+    threshold       risk threshold from threshold_config.joblib
+    source_name, source_sha256   joblib file the model was exported from
+
+    linear: coef (k, n_features), intercept (k,), cal_a (k,), cal_b (k,)
+        p = mean_k sigmoid(-(cal_a * (z @ coef + intercept) + cal_b))
+        (an uncalibrated model is stored with cal_a = -1, cal_b = 0)
+    forest / gbtree: left, right, feature, split, value (n_trees, max_nodes), depth
+        forest: sklearn trees, go left when z <= split, p = mean of leaf values
+        gbtree: XGBoost trees, go left when z < split (or missing and default_left),
+                p = sigmoid(base_margin + sum of leaf values)
+"""
+
+import numpy as np
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class NumpyModel:
+    """sklearn-compatible predict_proba on top of exported NumPy arrays"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with np.load(self.path, allow_pickle=False) as artifact:
+            self.params = {name: artifact[name] for name in artifact.files}
+
+        self.kind = str(self.params["kind"])
+        self.feature_names = [str(name) for name in self.params["feature_names"]]
+        self.threshold = float(self.params["threshold"])
+        self.source_name = str(self.params["source_name"])
+        self.source_sha256 = str(self.params["source_sha256"])
+        self.classes_ = np.array([0, 1])
+
+        if self.kind not in ("linear", "forest", "gbtree"):
+            raise ValueError(f"Unsupported exported model kind: {self.kind}")
+
+    def _preprocess(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        X = np.where(np.isnan(X), self.params["medians"], X)
+        return (X - self.params["mean"]) / self.params["scale"]
+
+    def _linear_proba(self, Z):
+        p = self.params
+        decision = Z @ p["coef"].T + p["intercept"]
+        return _sigmoid(-(p["cal_a"] * decision + p["cal_b"])).mean(axis=1)
+
+    def _leaf_values(self, Z):
+        """Walk every tree for every row at once; returns (n_rows, n_trees) leaf values"""
+        p = self.params
+        left, right, feature, split = p["left"], p["right"], p["feature"], p["split"]
+        n_trees = left.shape[0]
+        trees = np.arange(n_trees)[None, :]
+        rows = np.arange(Z.shape[0])[:, None]
+
+        # Both sklearn and XGBoost compare features as float32
+        Z = Z.astype(np.float32)
+        node = np.zeros((Z.shape[0], n_trees), dtype=np.int64)
+        for _ in range(int(p["depth"])):
+            is_leaf = left[trees, node] < 0
+            x = Z[rows, feature[trees, node]]
+            if self.kind == "gbtree":
+                go_left = np.where(np.isnan(x), p["default_left"][trees, node], x < split[trees, node])
+            else:
+                go_left = x <= split[trees, node]
+            node = np.where(is_leaf, node, np.where(go_left, left[trees, node], right[trees, node]))
+        return p["value"][trees, node]
+
+    def predict_proba(self, X):
+        Z = self._preprocess(X)
+        if self.kind == "linear":
+            positive = self._linear_proba(Z)
+        elif self.kind == "forest":
+            positive = self._leaf_values(Z).mean(axis=1)
+        else:
+            positive = _sigmoid(float(self.params["base_margin"]) + self._leaf_values(Z).sum(axis=1))
+        positive = np.clip(positive, 0.0, 1.0)
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
@@ -2,9 +2,18 @@
 PDF Report Generation Module
 """
 
+import copy
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+from src.artifact_store import artifact_key, artifact_name, get_artifact_store
+from src.pdf_pool import get_pdf_pool
+from src.singleflight import SingleFlight
+
 try:
     from reportlab.lib.pagesizes import letter
     from reportlab.lib import colors
@@ -16,27 +25,134 @@ try:
 except ImportError:
     HAS_REPORTLAB = False
 
+# Part of the stored file's content address: bump whenever ReportTemplate or the page layout changes
+TEMPLATE_VERSION = "1"
+
+# The prediction fields ReportTemplate and the text fallback print; the rest of the
+# result (screening_id, model_version, disclaimer, ...) does not change the document
+RENDERED_FIELDS = ("qchat_score", "qchat_risk_level", "model_probability_asd")
+
+# What _render produces (the text fallback is only cached when ReportLab is missing)
+REPORT_EXTENSION = "pdf" if HAS_REPORTLAB else "txt"
+
+
+def render_key(prediction_result, report_text):
+    """Content address of a report: hash of the rendered fields, the report text and the template version"""
+    rendered = {field: prediction_result.get(field) for field in RENDERED_FIELDS}
+    return artifact_key(rendered, report_text, TEMPLATE_VERSION)
+
+
+class ReportTemplate:
+    """Static parts of the PDF layout, built once per process.
+
+    Styles, the table style and the fixed headings are created (and their markup
+    parsed) here; story() only fills in the score, risk, confidence and report text.
+    """
+    
+    def __init__(self):
+        self.styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle(
+            'Title',
+            parent=self.styles['Heading1'],
+            fontSize=20,
+            textColor=colors.HexColor('#6fb0b7'),
+            spaceAfter=20,
+            alignment=TA_CENTER
+        )
+        self.table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0fafb')),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#ddd')),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ])
+        self.title = Paragraph("AUTISM PRE-SCREENING ASSESSMENT", self.title_style)
+        self.report_heading = Paragraph("CLINICAL ASSESSMENT", self.styles['Heading2'])
+    
+    def story(self, prediction_result, report_text):
+        """Flowables for one report"""
+        risk = prediction_result.get('qchat_risk_level')
+        score = prediction_result.get('qchat_score')
+        prob = prediction_result.get('model_probability_asd')
+        
+        results_table = Table([
+            ["Q-CHAT Score", f"{score}/10"],
+            ["Risk Level", risk],
+            ["Confidence", f"{prob*100:.1f}%"]
+        ])
+        results_table.setStyle(self.table_style)
+        
+        return [
+            self._copy(self.title),
+            Spacer(1, 0.2*inch),
+            results_table,
+            Spacer(1, 0.2*inch),
+            self._copy(self.report_heading),
+            Paragraph(report_text.replace('\n', '<br/>'), self.styles['Normal']),
+        ]
+    
+    def _copy(self, paragraph):
+        # Flowables keep layout state while a document is built, so every render gets
+        # its own instance; passing the parsed fragments skips parsing the markup again
+        return Paragraph(paragraph.text, paragraph.style, frags=[copy.copy(f) for f in paragraph.frags])
+
 
 class PDFReportGenerator:
     """Generate professional PDF reports"""
     
     def __init__(self):
         self.project_root = Path(__file__).resolve().parents[1]
-        self.output_dir = self.project_root / "reports"
-        self.output_dir.mkdir(exist_ok=True)
+        # Content-addressed: an identical report is rendered and stored once
+        self.artifacts = get_artifact_store()
+        self.output_dir = self.artifacts.root
+        # Identical documents requested at the same time are rendered once
+        self.inflight = SingleFlight()
+        self._writer_pool = None
+        self._writer_pid = None
     
     def generate(self, prediction_result, report_text):
-        """Generate PDF report"""
+        """Generate PDF report, or return the stored one (concurrent identical requests share one render)"""
+        key = render_key(prediction_result, report_text)
+        return self.inflight.do(("file", key), self._generate, prediction_result, report_text, key)
+    
+    def render_bytes(self, prediction_result, report_text):
+        """Render the report in memory (or read the stored one). Returns (filename, data); nothing is written."""
+        key = render_key(prediction_result, report_text)
+        return self.inflight.do(("bytes", key), self._load_or_render, prediction_result, report_text, key)
+    
+    def _generate(self, prediction_result, report_text, key):
+        stored = self.artifacts.get(key, REPORT_EXTENSION)
+        if stored is not None:
+            return stored
+        filename, data = self._render_offloaded(prediction_result, report_text)
+        filepath = self.save(filename, data)
+        print(f"✓ PDF generated: {filepath}")
+        return filepath
+    
+    def _load_or_render(self, prediction_result, report_text, key):
+        stored = self.artifacts.get(key, REPORT_EXTENSION)
+        if stored is not None:
+            try:
+                return stored.name, stored.read_bytes()
+            except FileNotFoundError:
+                pass  # removed since the lookup: render again
+        return self._render_offloaded(prediction_result, report_text)
+    
+    def _render_offloaded(self, prediction_result, report_text):
+        """Render on the PDF process pool (in this thread when the pool is disabled)"""
+        pool = get_pdf_pool()
+        if pool is None:
+            return self._render(prediction_result, report_text)
+        return pool.render(prediction_result, report_text)
+    
+    def _render(self, prediction_result, report_text):
         if not HAS_REPORTLAB:
-            return self._create_text_report(prediction_result, report_text)
+            return self._render_text_report(prediction_result, report_text)
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"autism_screening_{timestamp}.pdf"
-        filepath = self.output_dir / filename
+        filename = artifact_name(render_key(prediction_result, report_text), "pdf")
         
         try:
+            buffer = io.BytesIO()
             doc = SimpleDocTemplate(
-                str(filepath),
+                buffer,
                 pagesize=letter,
                 rightMargin=0.5*inch,
                 leftMargin=0.5*inch,
@@ -46,62 +162,41 @@ class PDFReportGenerator:
             
             story = self._build_story(prediction_result, report_text)
             doc.build(story)
-            print(f"✓ PDF generated: {filepath}")
-            return filepath
+            return filename, buffer.getvalue()
         
         except Exception as e:
             print(f"PDF generation error: {e}")
-            return self._create_text_report(prediction_result, report_text)
+            return self._render_text_report(prediction_result, report_text)
+    
+    def save(self, filename, data):
+        """Store a rendered report (atomically, once per content address) and return its path"""
+        return self.artifacts.put(filename, data)
+    
+    def save_async(self, filename, data, on_saved=None):
+        """Persist in the background; on_saved(path) runs once the file is written"""
+        def _save():
+            try:
+                path = self.save(filename, data)
+                if on_saved is not None:
+                    on_saved(path)
+            except Exception as e:
+                print(f"[PDF] Warning: failed to persist {filename}: {e}")
+        return self._writer().submit(_save)
+    
+    def _writer(self):
+        # One writer thread per process (created lazily, so never inherited across a fork)
+        if self._writer_pool is None or self._writer_pid != os.getpid():
+            self._writer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-writer")
+            self._writer_pid = os.getpid()
+        return self._writer_pool
     
     def _build_story(self, prediction_result, report_text):
         """Build PDF content"""
-        story = []
-        styles = getSampleStyleSheet()
-        
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Heading1'],
-            fontSize=20,
-            textColor=colors.HexColor('#6fb0b7'),
-            spaceAfter=20,
-            alignment=TA_CENTER
-        )
-        
-        # Title
-        story.append(Paragraph("AUTISM PRE-SCREENING ASSESSMENT", title_style))
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Results table
-        risk = prediction_result.get('qchat_risk_level')
-        score = prediction_result.get('qchat_score')
-        prob = prediction_result.get('model_probability_asd')
-        
-        results_data = [
-            ["Q-CHAT Score", f"{score}/10"],
-            ["Risk Level", risk],
-            ["Confidence", f"{prob*100:.1f}%"]
-        ]
-        
-        results_table = Table(results_data)
-        results_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0fafb')),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#ddd')),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ]))
-        story.append(results_table)
-        story.append(Spacer(1, 0.2*inch))
-        
-        # Report
-        story.append(Paragraph("CLINICAL ASSESSMENT", styles['Heading2']))
-        story.append(Paragraph(report_text.replace('\n', '<br/>'), styles['Normal']))
-        
-        return story
+        return get_report_template().story(prediction_result, report_text)
     
-    def _create_text_report(self, prediction_result, report_text):
-        """Create text report fallback"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"autism_screening_{timestamp}.txt"
-        filepath = self.output_dir / filename
+    def _render_text_report(self, prediction_result, report_text):
+        """Text report fallback. Returns (filename, data)."""
+        filename = artifact_name(render_key(prediction_result, report_text), "txt")
         
         content = f"""AUTISM PRE-SCREENING ASSESSMENT REPORT
 Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
@@ -121,22 +216,47 @@ DISCLAIMER
 This is a screening tool, not a diagnosis. Professional evaluation is required.
 """
         
-        with open(filepath, 'w') as f:
-            f.write(content)
-        
-        return filepath
+        return filename, content.encode("utf-8")
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def get_report_template():
+    """Process-wide PDF layout template, built on first use"""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = ReportTemplate()
+    return _template
 
 
 _pdf_generator = None
+_pdf_generator_lock = threading.Lock()
 
 
 def get_pdf_generator():
     global _pdf_generator
     if _pdf_generator is None:
-        _pdf_generator = PDFReportGenerator()
+        # One generator per process, so all callers share its single-flight group
+        with _pdf_generator_lock:
+            if _pdf_generator is None:
+                _pdf_generator = PDFReportGenerator()
     return _pdf_generator
 
 
 def generate_pdf_report(prediction_result, report_text):
     generator = get_pdf_generator()
     return generator.generate(prediction_result, report_text)
+
+
+def generate_pdf_bytes(prediction_result, report_text):
+    """Render in memory: returns (filename, data) without touching the disk"""
+    generator = get_pdf_generator()
+    return generator.render_bytes(prediction_result, report_text)
+
+
+def report_content_type(filename):
+    return "text/plain; charset=utf-8" if str(filename).endswith(".txt") else "application/pdf"
@@ -0,0 +1,195 @@
+"""
+PDF Render Pool
+
+ReportLab rendering is pure-Python CPU work; run in a request thread it holds
+the GIL and slows every other request of that worker (predictions included).
+The pool renders in separate processes instead, so the API process only waits
+on a future while PDFs are produced.
+
+Each worker is its own single-process executor, and a render is only handed
+to an idle worker (until then it waits in the API process), so
+PDF_POOL_TIMEOUT counts from the moment the render starts. A render that
+exceeds it has its worker process killed and replaced; renders on the other
+workers carry on. Workers are started with the "spawn" method (a fork of a
+threaded server is unsafe) and only import the PDF module. A worker is also
+replaced after PDF_POOL_MAX_RENDERS renders, which caps memory growth in
+long-lived API processes.
+
+The pool is only used once enable_pdf_pool() has been called, which the API
+servers do at import. Everything else (scripts, tests, the nested tool)
+renders in the calling thread, so it needs no "if __name__ ==" guard for
+spawned processes.
+
+Environment configuration:
+    PDF_POOL_WORKERS      render processes per API process (default 2, 0 = render in the calling thread)
+    PDF_POOL_MAX_PENDING  waiting + running renders before render() refuses (default 32)
+    PDF_POOL_TIMEOUT      seconds one render may run (default 30)
+    PDF_POOL_MAX_RENDERS  renders before a worker process is replaced (default 200, 0 = never)
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+
+class PDFPoolFull(Exception):
+    """Too many PDF renders queued"""
+
+
+def _render_in_worker(prediction_result, report_text):
+    # Runs in a pool process: render in memory, the parent writes any file
+    from src.pdf_generator import get_pdf_generator
+    return get_pdf_generator()._render(prediction_result, report_text)
+
+
+class PDFRenderPool:
+    """Bounded process pool for PDF rendering with per-worker timeouts and recycling"""
+
+    def __init__(self, workers=2, max_pending=32, timeout=30, max_renders=200):
+        self.workers = max(int(workers), 1)
+        self.max_pending = max(int(max_pending), 1)
+        self.timeout = timeout
+        self.max_renders = int(max_renders)
+        self._idle = []
+        self._renders = {}  # worker -> renders done
+        self._pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._worker_free = threading.Condition(self._lock)
+        self.rendered = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.recycled = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            workers=int(os.getenv("PDF_POOL_WORKERS", "2")),
+            max_pending=int(os.getenv("PDF_POOL_MAX_PENDING", "32")),
+            timeout=float(os.getenv("PDF_POOL_TIMEOUT", "30")),
+            max_renders=int(os.getenv("PDF_POOL_MAX_RENDERS", "200")),
+        )
+
+    def render(self, prediction_result, report_text):
+        """Render in a worker process. Returns (filename, data); raises PDFPoolFull when backed up."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PDFPoolFull(f"Too many PDF renders pending ({self.max_pending})")
+            self._pending += 1
+        try:
+            worker = self._acquire()
+            try:
+                # The worker is idle, so the render starts now and the timeout excludes queueing
+                result = worker.submit(_render_in_worker, prediction_result, report_text).result(timeout=self.timeout)
+            except FutureTimeout:
+                with self._lock:
+                    self.timeouts += 1
+                self._discard(worker, kill=True)
+                raise TimeoutError(f"PDF render exceeded {self.timeout}s")
+            except BrokenProcessPool:
+                with self._lock:
+                    self.failures += 1
+                self._discard(worker, kill=True)
+                raise
+            except Exception:
+                self._release(worker)  # the render itself failed; the worker is fine
+                raise
+            except BaseException:
+                self._discard(worker)  # interrupted while the render may still run: don't reuse the worker
+                raise
+            self._release(worker)
+            with self._lock:
+                self.rendered += 1
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _acquire(self):
+        """An idle worker of this process, started if there are fewer than `workers`"""
+        with self._worker_free:
+            if self._pid != os.getpid():
+                # Forked: the parent's workers belong to the parent
+                self._idle, self._renders, self._pid = [], {}, os.getpid()
+            while not self._idle and len(self._renders) >= self.workers:
+                self._worker_free.wait()
+            if self._idle:
+                return self._idle.pop()
+            worker = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            self._renders[worker] = 0
+            return worker
+
+    def _release(self, worker):
+        """Return a worker after a render, replacing it every max_renders renders"""
+        with self._worker_free:
+            if worker not in self._renders:
+                return
+            self._renders[worker] += 1
+            if self.max_renders and self._renders[worker] >= self.max_renders:
+                del self._renders[worker]
+                self.recycled += 1
+                worker.shutdown(wait=False)  # its process exits; the next render starts a fresh one
+            else:
+                self._idle.append(worker)
+            self._worker_free.notify()
+
+    def _discard(self, worker, kill=False):
+        """Replace a worker; with kill, terminate its process (stuck or broken render)"""
+        with self._worker_free:
+            if self._renders.pop(worker, None) is not None:
+                self.recycled += 1
+            self._worker_free.notify()
+        if kill:
+            for process in list((getattr(worker, "_processes", None) or {}).values()):
+                process.terminate()
+        worker.shutdown(wait=False)
+
+    def shutdown(self):
+        """Stop the idle workers (busy ones finish their render and are not reused)"""
+        with self._worker_free:
+            if self._pid != os.getpid():
+                return
+            idle, self._idle, self._renders = self._idle, [], {}
+        for worker in idle:
+            worker.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "busy": len(self._renders) - len(self._idle),
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "rendered": self.rendered,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                "recycled": self.recycled,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_enabled = False
+
+
+def enable_pdf_pool():
+    """Render PDFs of this process on the pool (called by the API servers)"""
+    global _enabled
+    _enabled = True
+
+
+def get_pdf_pool():
+    """Process-wide PDF render pool, or None when not enabled or PDF_POOL_WORKERS=0"""
+    global _pool
+    if not _enabled or int(os.getenv("PDF_POOL_WORKERS", "2")) <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PDFRenderPool.from_env()
+    return _pool
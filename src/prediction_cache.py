@@ -0,0 +1,59 @@
+"""
+Prediction Cache
+
+Size-bounded LRU cache of model probabilities keyed on the 14-feature vector.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """Thread-safe LRU mapping feature tuple -> ASD probability"""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = max(int(maxsize), 0)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached probability or None"""
+        if not self.maxsize:
+            return None
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry and reset the counters (e.g. after a model reload)"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
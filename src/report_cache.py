@@ -0,0 +1,164 @@
+"""
+LLM Report Cache
+
+The report prompt only depends on the Q-CHAT score (0-10), the risk level and
+the interpretation derived from them, so there are only a few dozen distinct
+prompts. Generated reports are kept in SQLite keyed by a hash of the prompt,
+the LLM model name and PROMPT_VERSION, so a repeated prompt skips the LLM call
+and the cache survives restarts (and is shared by every worker on the host).
+
+Template fallback reports are never cached.
+
+A hit does not write to the database: last_used (which only orders LRU
+eviction) is refreshed when it is older than a tenth of the TTL, and those
+refreshes are batched into the next put().
+
+Environment configuration:
+    REPORT_CACHE              "1" (default) to enable, "0" to always call the LLM
+    REPORT_CACHE_DB           SQLite file (default <project>/cache/llm_reports.db)
+    REPORT_CACHE_TTL          seconds a report stays valid (default 604800, 0 = forever)
+    REPORT_CACHE_MAX_ENTRIES  least recently used reports beyond this are evicted (default 1000)
+
+Pre-generate every combination with:
+    python -m src.warm_report_cache
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def report_cache_key(prompt, model_name, prompt_version):
+    data = "\0".join([str(prompt_version), str(model_name), prompt]).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class ReportCache:
+    """Persistent prompt-hash -> report text cache with TTL and LRU eviction"""
+
+    def __init__(self, db_path, ttl=604800, max_entries=1000):
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self.max_entries = max(int(max_entries), 1)
+        self._db = None
+        self._db_pid = None
+        self._lock = threading.Lock()
+        # last_used is only refreshed once it is this old (an hour when reports never expire)
+        self.touch_interval = self.ttl / 10 if self.ttl else 3600
+        # key -> last_used still to be written, flushed by put()
+        self._touched = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.getenv("REPORT_CACHE_DB") or PROJECT_ROOT / "cache" / "llm_reports.db",
+            ttl=float(os.getenv("REPORT_CACHE_TTL", "604800")),
+            max_entries=int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "1000")),
+        )
+
+    def _connection(self):
+        """SQLite connection for this process (never shared across a fork). Call with _lock held."""
+        if self._db is None or self._db_pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS reports ("
+                "key TEXT PRIMARY KEY, model TEXT, prompt_version TEXT, report TEXT NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+    def get(self, key):
+        """Return the cached report or None (missing or expired)"""
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            row = db.execute("SELECT report, created, last_used FROM reports WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            if now - row[2] > self.touch_interval:
+                self._touched[key] = now
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, report, model_name=None, prompt_version=None):
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO reports (key, model, prompt_version, report, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, str(prompt_version), report, now, now),
+            )
+            self._flush_touched(db)
+            self._evict(db, now)
+            db.commit()
+
+    def _flush_touched(self, db):
+        if self._touched:
+            db.executemany(
+                "UPDATE reports SET last_used = MAX(last_used, ?) WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self, db, now):
+        removed = 0
+        if self.ttl:
+            removed += db.execute("DELETE FROM reports WHERE created < ?", (now - self.ttl,)).rowcount
+        count = db.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        if count > self.max_entries:
+            removed += db.execute(
+                "DELETE FROM reports WHERE key IN (SELECT key FROM reports ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            ).rowcount
+        self.evictions += removed
+
+    def clear(self):
+        with self._lock:
+            db = self._connection()
+            db.execute("DELETE FROM reports")
+            db.commit()
+            self._touched.clear()
+
+    def stats(self):
+        with self._lock:
+            size = self._connection().execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "db": str(self.db_path),
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_report_cache():
+    """Process-wide report cache, or None when REPORT_CACHE=0"""
+    global _cache
+    if os.getenv("REPORT_CACHE", "1") == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ReportCache.from_env()
+    return _cache
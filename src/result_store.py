@@ -0,0 +1,258 @@
+"""
+Screening Result Store
+
+Keeps each screening's prediction, report and PDF under a random screening_id
+so clients can refer to it instead of re-posting the prediction and report
+text, and repeated report/PDF requests reuse what was already produced.
+
+An in-process LRU answers most lookups. With RESULT_STORE_DB set, records are
+also written through to SQLite, so they are shared by all workers on the host
+and survive restarts. Expired records are purged (memory and SQLite) at most
+once a minute, from create().
+
+Environment configuration:
+    RESULT_STORE_SIZE   records kept in memory (default 10000)
+    RESULT_STORE_TTL    seconds a screening stays retrievable (default 86400, 0 = forever)
+    RESULT_STORE_DB     SQLite file for the shared/persistent copy (default: memory only)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+# Seconds between sweeps of expired screenings
+PURGE_INTERVAL = 60
+
+
+class ResultStore:
+    """LRU of screening records with optional SQLite write-through"""
+
+    def __init__(self, maxsize=10000, ttl=86400, db_path=None):
+        self.maxsize = max(int(maxsize), 1)
+        self.ttl = ttl
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        self._db_lock = threading.Lock()
+        self._last_purge = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.purged = 0
+
+    def _connection(self):
+        """SQLite connection for this process (never shared across a fork). Call with _db_lock held."""
+        if self._db is None or self._db_pid != os.getpid():
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS screenings ("
+                "id TEXT PRIMARY KEY, created REAL NOT NULL, record TEXT NOT NULL)"
+            )
+            self._db.commit()
+            self._db_pid = os.getpid()
+            print(f"[ResultStore] ✓ SQLite store: {self.db_path}")
+        return self._db
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            maxsize=int(os.getenv("RESULT_STORE_SIZE", "10000")),
+            ttl=float(os.getenv("RESULT_STORE_TTL", "86400")),
+            db_path=os.getenv("RESULT_STORE_DB") or None,
+        )
+
+    def _expired(self, created):
+        return bool(self.ttl) and time.time() - created > self.ttl
+
+    def create(self, prediction_result):
+        """Store a new screening and return its screening_id"""
+        screening_id = uuid.uuid4().hex
+        self._put(screening_id, {"created": time.time(), "prediction_result": prediction_result})
+        self._maybe_purge()
+        return screening_id
+
+    def get(self, screening_id):
+        """Return the screening record (a copy) or None if unknown or expired"""
+        if not screening_id:
+            return None
+        with self._lock:
+            record = self._entries.get(screening_id)
+            if record is not None:
+                if self._expired(record["created"]):
+                    del self._entries[screening_id]
+                    record = None
+                else:
+                    self._entries.move_to_end(screening_id)
+        if record is None:
+            record = self._db_get(screening_id)
+            if record is None:
+                self.misses += 1
+                return None
+            self._remember(screening_id, record)
+        self.hits += 1
+        return dict(record)
+
+    def update(self, screening_id, **fields):
+        """Add artifacts (report, pdf_path, ...) to an existing screening; returns the merged record.
+
+        With SQLite the merge happens in one transaction against the stored row, so
+        fields written by another worker are kept even if this worker's copy is stale.
+        """
+        if self.db_path:
+            record = self._db_modify(screening_id, lambda record: record.update(fields) or True)
+            return dict(record) if record is not None else None
+        with self._lock:
+            record = self._entries.get(screening_id)
+            if record is None or self._expired(record["created"]):
+                return None
+            record = dict(record, **fields)
+            self._entries[screening_id] = record
+            self._entries.move_to_end(screening_id)
+        return dict(record)
+
+    def setdefault(self, screening_id, field, value):
+        """Store field unless the screening already has it; return the value that is kept.
+
+        Artifacts produced concurrently (e.g. a speculative report and a requested one)
+        resolve to whichever was stored first, so every caller sees the same report.
+        """
+        if self.db_path:
+            def keep_first(record):
+                if record.get(field) is not None:
+                    return False
+                record[field] = value
+                return True
+            record = self._db_modify(screening_id, keep_first)
+            return record[field] if record is not None else value
+        with self._lock:
+            record = self._entries.get(screening_id)
+            if record is None:
+                return value
+            if record.get(field) is None:
+                record = dict(record, **{field: value})
+                self._entries[screening_id] = record
+            return record[field]
+
+    def _db_modify(self, screening_id, modify):
+        """Read, change and write one stored record in a single transaction.
+
+        modify(record) changes the record in place and returns True if it must be
+        written. The in-memory copy is refreshed from the result. Returns the record,
+        or None if the screening is unknown or expired.
+        """
+        with self._db_lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT created, record FROM screenings WHERE id = ?", (screening_id,)
+                ).fetchone()
+                if row is None or self._expired(row[0]):
+                    db.rollback()
+                    return None
+                record = json.loads(row[1])
+                if modify(record):
+                    db.execute(
+                        "INSERT OR REPLACE INTO screenings (id, created, record) VALUES (?, ?, ?)",
+                        (screening_id, record["created"], json.dumps(record, default=str)),
+                    )
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        self._remember(screening_id, record)
+        return record
+
+    def _put(self, screening_id, record):
+        self._remember(screening_id, record)
+        if self.db_path:
+            with self._db_lock:
+                db = self._connection()
+                db.execute(
+                    "INSERT OR REPLACE INTO screenings (id, created, record) VALUES (?, ?, ?)",
+                    (screening_id, record["created"], json.dumps(record, default=str)),
+                )
+                db.commit()
+
+    def _remember(self, screening_id, record):
+        with self._lock:
+            self._entries[screening_id] = record
+            self._entries.move_to_end(screening_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _db_get(self, screening_id):
+        if not self.db_path:
+            return None
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT created, record FROM screenings WHERE id = ?", (screening_id,)
+            ).fetchone()
+        if row is None or self._expired(row[0]):
+            return None
+        return json.loads(row[1])
+
+    def _maybe_purge(self):
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            self.purge_expired()
+        except Exception as e:
+            print(f"[ResultStore] Warning: purge of expired screenings failed: {e}")
+
+    def purge_expired(self):
+        """Delete expired screenings from memory and SQLite. Returns the number removed."""
+        if not self.ttl:
+            return 0
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            stale = [key for key, record in self._entries.items() if record["created"] < cutoff]
+            for key in stale:
+                del self._entries[key]
+        removed = len(stale)
+        if self.db_path:
+            with self._db_lock:
+                db = self._connection()
+                removed = max(removed, db.execute(
+                    "DELETE FROM screenings WHERE created < ?", (cutoff,)
+                ).rowcount)
+                db.commit()
+        self.purged += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "purged": self.purged,
+            "db": str(self.db_path) if self.db_path else None,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_result_store():
+    """Process-wide store, configured from the environment on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore.from_env()
+    return _store
@@ -0,0 +1,180 @@
+"""
+Retention for the reports directory
+
+Every rendered report is kept on disk, so without limits reports/ grows until
+directory scans slow down and the disk fills. A sweeper thread periodically:
+
+  1. deletes reports written more than RETENTION_MAX_AGE seconds ago,
+  2. deletes least recently used reports until the total size is at most
+     RETENTION_MAX_BYTES.
+
+"Used" is the file's access time, which the artifact store and the download
+route set explicitly on every reuse (so it does not depend on atime mount
+options). A deleted report is rendered again the next time it is requested.
+Temporary files left behind by a crashed writer are removed after an hour.
+
+Environment configuration:
+    RETENTION_MAX_BYTES  total size of kept reports (default 1073741824 = 1 GiB, 0 = no limit)
+    RETENTION_MAX_AGE    seconds a report is kept (default 2592000 = 30 days, 0 = forever)
+    RETENTION_INTERVAL   seconds between sweeps (default 300, 0 = no sweeper thread)
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+from src.artifact_store import ARTIFACT_PREFIX, get_artifact_store
+
+REPORT_SUFFIXES = (".pdf", ".txt")
+
+# Seconds before an orphaned temp file of an interrupted write is removed
+STALE_TEMP_AGE = 3600
+
+
+class RetentionManager:
+    """Size- and age-bounded LRU eviction over a reports directory"""
+
+    def __init__(self, root, max_bytes=1073741824, max_age=2592000, interval=300):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.max_age = max_age
+        self.interval = interval
+        self._sweeper = None
+        self._lock = threading.Lock()
+        self.sweeps = 0
+        self.bytes_stored = 0
+        self.files_stored = 0
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.expired_files = 0
+        self.last_sweep = None
+        self.last_sweep_seconds = None
+        self.last_error = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            get_artifact_store().root,
+            max_bytes=int(os.getenv("RETENTION_MAX_BYTES", "1073741824")),
+            max_age=float(os.getenv("RETENTION_MAX_AGE", "2592000")),
+            interval=float(os.getenv("RETENTION_INTERVAL", "300")),
+        )
+
+    def _scan(self, now):
+        """(path, size, written, last_used) for every report; also drops stale temp files"""
+        files = []
+        for dirpath, _, filenames in os.walk(str(self.root)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                    if filename.startswith(".tmp-"):
+                        if now - st.st_mtime > STALE_TEMP_AGE:
+                            os.unlink(path)
+                        continue
+                except FileNotFoundError:
+                    continue  # removed meanwhile (another worker's sweep, a finished write)
+                if filename.startswith(ARTIFACT_PREFIX) and filename.endswith(REPORT_SUFFIXES):
+                    files.append((path, st.st_size, st.st_mtime, max(st.st_atime, st.st_mtime)))
+        return files
+
+    def _remove(self, path):
+        try:
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def sweep(self):
+        """Apply the age and size limits once. Returns {"expired": n, "evicted": n, "freed_bytes": n}."""
+        started = time.monotonic()
+        now = time.time()
+        files = self._scan(now)
+        expired = evicted = freed = 0
+
+        if self.max_age:
+            kept = []
+            for entry in files:
+                if now - entry[2] > self.max_age:
+                    if self._remove(entry[0]):
+                        expired += 1
+                        freed += entry[1]
+                else:
+                    kept.append(entry)
+            files = kept
+
+        total = sum(entry[1] for entry in files)
+        if self.max_bytes and total > self.max_bytes:
+            files.sort(key=lambda entry: entry[3])  # least recently used first
+            while files and total > self.max_bytes:
+                path, size, _, _ = files.pop(0)
+                total -= size
+                if self._remove(path):
+                    evicted += 1
+                    freed += size
+
+        with self._lock:
+            self.sweeps += 1
+            self.bytes_stored = total
+            self.files_stored = len(files)
+            self.expired_files += expired
+            self.evicted_files += evicted
+            self.evicted_bytes += freed
+            self.last_sweep = now
+            self.last_sweep_seconds = time.monotonic() - started
+        if expired or evicted:
+            print(f"[Retention] Removed {expired} expired and {evicted} least recently used reports "
+                  f"({freed} bytes); {len(files)} reports, {total} bytes kept")
+        return {"expired": expired, "evicted": evicted, "freed_bytes": freed}
+
+    def start_sweeper(self):
+        """Sweep every `interval` seconds in a daemon thread (call in every worker process)"""
+        if self.interval <= 0 or (self._sweeper is not None and self._sweeper.is_alive()):
+            return
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="report-retention", daemon=True)
+        self._sweeper.start()
+        print(f"[Retention] Sweeping {self.root} every {self.interval}s "
+              f"(max {self.max_bytes} bytes, max age {self.max_age}s)")
+
+    def _sweep_loop(self):
+        while True:
+            try:
+                self.sweep()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[Retention] Sweep error: {e}")
+            time.sleep(self.interval)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "max_bytes": self.max_bytes,
+                "max_age": self.max_age,
+                "bytes_stored": self.bytes_stored,
+                "files_stored": self.files_stored,
+                "evicted_files": self.evicted_files,
+                "evicted_bytes": self.evicted_bytes,
+                "expired_files": self.expired_files,
+                "sweeps": self.sweeps,
+                "last_sweep": self.last_sweep,
+                "last_sweep_seconds": self.last_sweep_seconds,
+                "last_error": self.last_error,
+                "sweeping": self._sweeper is not None and self._sweeper.is_alive(),
+            }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_retention_manager():
+    """Process-wide retention manager, configured from the environment on first use"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = RetentionManager.from_env()
+    return _manager
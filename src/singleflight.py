@@ -0,0 +1,97 @@
+"""
+Single-flight call de-duplication
+
+Concurrent calls with the same key share one execution: the first caller runs
+the function, later callers wait for it and receive the same result (or the
+same exception). Once the call finishes the key is forgotten, so this is not a
+cache, only a guard against identical work running twice at the same time
+(double clicks, many screenings with identical scores arriving together).
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-based single-flight group"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) unless a call with this key is in flight; then wait for its outcome"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._calls)
+        return {"executions": self.executions, "shared": self.shared, "in_flight": in_flight}
+
+
+class AsyncSingleFlight:
+    """asyncio single-flight group (calls are grouped per event loop)
+
+    The shared work runs in its own task, so a cancelled caller (the leader
+    included, e.g. a closed browser tab) never cancels it for the others.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key, coro_fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        task = self._calls.get(slot)
+        if task is not None:
+            self.shared += 1
+        else:
+            task = self._calls[slot] = loop.create_task(coro_fn(*args, **kwargs))
+            task.add_done_callback(lambda t: self._forget(slot, t))
+            self.executions += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, slot, task):
+        if self._calls.get(slot) is task:
+            del self._calls[slot]
+        # Mark the outcome as retrieved, in case every caller was cancelled meanwhile
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {"executions": self.executions, "shared": self.shared, "in_flight": len(self._calls)}
@@ -0,0 +1,67 @@
+"""
+Pre-generate the LLM report for every (Q-CHAT score, risk level) combination
+
+The report prompt is built from the score (0-10), the risk level and the
+interpretation derived from both, so 33 LLM calls fill the report cache for
+every result the API can produce.
+
+Usage:
+    python -m src.warm_report_cache            # generate missing/expired reports
+    python -m src.warm_report_cache --refresh  # regenerate everything
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.inference import RISK_LEVELS, get_interpretation
+from src.llm_report_groq import PROMPT_VERSION, get_generator
+from src.report_cache import get_report_cache
+
+
+def report_inputs():
+    """Every prompt-relevant result the predictor can return"""
+    for risk_level in RISK_LEVELS:
+        for score in range(0, 11):
+            yield {
+                "qchat_score": score,
+                "qchat_risk_level": risk_level,
+                "qchat_referral_interpretation": get_interpretation(risk_level, score),
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate cached LLM reports")
+    parser.add_argument("--refresh", action="store_true", help="regenerate reports that are already cached")
+    args = parser.parse_args()
+
+    cache = get_report_cache()
+    if cache is None:
+        print("❌ Report cache is disabled (REPORT_CACHE=0)")
+        return 1
+    generator = get_generator()
+    if not generator.llm:
+        print("❌ GROQ_API_KEY is not set; nothing to warm")
+        return 1
+
+    print(f"Warming report cache {cache.db_path} (model {generator.model_name}, prompt v{PROMPT_VERSION})")
+    counts = {"cached": 0, "generated": 0, "failed": 0}
+    for result in report_inputs():
+        label = f"{result['qchat_risk_level']:<6} score {result['qchat_score']:>2}"
+        try:
+            status = generator.warm_cache_entry(result, refresh=args.refresh)
+            print(f"  {label}: {status}")
+        except Exception as e:
+            status = "failed"
+            print(f"  {label}: ❌ {e}")
+        counts[status] += 1
+
+    print(f"✓ Done: {counts['generated']} generated, {counts['cached']} already cached, {counts['failed']} failed")
+    print(f"  {cache.stats()}")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+from src.api_common import validate_batch, validate_predict_payload
+
+
+def _payload(**overrides):
+    payload = {
+        "age_mons": 28,
+        "gender": "male",
+        "jaundice": "no",
+        "family_mem_with_asd": "yes",
+        "qchat_answers": {str(i): "A" for i in range(1, 11)},
+    }
+    payload.update(overrides)
+    return payload
+
+
+def test_valid_payload_is_normalized():
+    payload = _payload(age_mons="30", gender=1, jaundice=False)
+    assert validate_predict_payload(payload) is None
+    assert set(payload["qchat_answers"]) == set(range(1, 11))
+
+
+def test_values_that_cannot_be_scored_are_rejected():
+    assert "age_mons" in validate_predict_payload(_payload(age_mons="two years"))
+    assert "age_mons" in validate_predict_payload(_payload(age_mons=None))
+    assert "age_mons" in validate_predict_payload(_payload(age_mons=10 ** 30))
+    assert "jaundice" in validate_predict_payload(_payload(jaundice=None))
+    assert "gender" in validate_predict_payload(_payload(gender=[1]))
+    assert "keys" in validate_predict_payload(_payload(qchat_answers={f"q{i}": "A" for i in range(10)}))
+
+
+def test_batch_reports_every_failing_record_before_scoring():
+    records = [_payload(), _payload(age_mons="abc"), _payload(), "not a record", _payload(gender=None)]
+
+    error, details = validate_batch(records, max_records=10)
+
+    assert error == "Invalid records"
+    assert [d["index"] for d in details] == [1, 3, 4]
+    assert "age_mons" in details[0]["error"]
+
+
+def test_batch_limits():
+    assert validate_batch([], max_records=10)[0] == "Expected a non-empty list of records"
+    assert validate_batch(None, max_records=10)[0] == "Expected a non-empty list of records"
+    assert validate_batch([_payload()] * 3, max_records=2)[0].startswith("Batch too large")
+    assert validate_batch([_payload(), _payload()], max_records=2) == (None, None)
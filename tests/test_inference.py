@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.inference import AutismPredictor
+from src.prediction_cache import PredictionCache
+
+
+class FakeModel:
+    def __init__(self):
+        self.rows_scored = 0
+
+    def predict_proba(self, X):
+        self.rows_scored += len(X)
+        return np.column_stack([np.full(len(X), 0.7), np.full(len(X), 0.3)])
+
+
+def _predictor():
+    # No probability table, so every prediction goes through the cache
+    predictor = AutismPredictor.__new__(AutismPredictor)
+    predictor.model = FakeModel()
+    predictor.backend = "numpy"
+    predictor.model_path = Path("fake_model.npz")
+    predictor.model_sha256 = "0" * 64
+    predictor.threshold_config = {"threshold": 0.5}
+    predictor.probability_table = None
+    predictor.table_age_min = None
+    predictor.cache = PredictionCache(16)
+    return predictor
+
+
+def _payload(age_mons=28):
+    return {
+        "age_mons": age_mons,
+        "gender": "male",
+        "jaundice": "no",
+        "family_mem_with_asd": "yes",
+        "qchat_answers": {i: "A" for i in range(1, 11)},
+    }
+
+
+def test_repeated_predictions_are_served_from_the_cache():
+    predictor = _predictor()
+
+    first = predictor.predict(_payload())
+    assert predictor.cache_info()["misses"] == 1 and predictor.cache_info()["hits"] == 0
+
+    assert predictor.predict(_payload()) == first
+    assert predictor.predict(_payload()) == first
+    info = predictor.cache_info()
+    assert (info["hits"], info["misses"], info["size"]) == (2, 1, 1)
+    assert predictor.model.rows_scored == 1
+
+    predictor.predict(_payload(age_mons=30))
+    assert predictor.cache_info()["misses"] == 2
+    assert predictor.model.rows_scored == 2
@@ -0,0 +1,293 @@
+import asyncio
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import groq
+import httpx
+import pytest
+
+from src.llm_client import CircuitBreaker, LLMClient, LLMUnavailable
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.available()
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def _open_and_expire(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    _open_and_expire(breaker)
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == "half-open"
+    assert not breaker.allow()  # second caller waits for the trial's verdict
+
+
+def test_half_open_trial_success_closes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    _open_and_expire(breaker)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_half_open_trial_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10)
+    _open_and_expire(breaker)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.available()
+
+
+def test_abandoned_trial_frees_the_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    _open_and_expire(breaker)
+    assert breaker.allow()
+    breaker.abandon()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+
+class _HangingCompletions:
+    def __init__(self):
+        self.started = None
+
+    async def create(self, **kwargs):
+        self.started.set()
+        await asyncio.sleep(3600)
+
+
+def _client_with(async_completions=None, completions=None, **kwargs):
+    kwargs = {"breaker_failures": 1, "breaker_reset": 10, **kwargs}
+    client = LLMClient("test-key", "test-model", **kwargs)
+    # Skip building real HTTP clients for this process
+    client._client_pid = os.getpid()
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    client._async_client = SimpleNamespace(chat=SimpleNamespace(completions=async_completions))
+    return client
+
+
+def test_cancelled_half_open_trial_does_not_wedge_the_breaker():
+    completions = _HangingCompletions()
+    client = _client_with(async_completions=completions)
+    _open_and_expire(client.breaker)
+
+    async def scenario():
+        completions.started = asyncio.Event()
+        task = asyncio.ensure_future(client.acomplete("prompt"))
+        await completions.started.wait()
+        assert client.breaker.state == "half-open"
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert client.breaker.state == "half-open"
+    assert client.breaker.allow()  # the next call becomes the trial
+
+
+def _timeout_error():
+    return groq.APITimeoutError(request=httpx.Request("POST", "https://api.groq.test"))
+
+
+def _completion(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class _FlakyCompletions:
+    """Fails the first `failures` calls with a retryable error, sleeping `delay` seconds per call"""
+
+    def __init__(self, failures, delay=0.0, error=_timeout_error):
+        self.failures = failures
+        self.delay = delay
+        self.error = error
+        self.timeouts = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.timeouts.append(kwargs["timeout"])
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            calls = len(self.timeouts)
+        try:
+            time.sleep(self.delay)
+            if calls <= self.failures:
+                raise self.error()
+            return _completion("report")
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_transient_errors_are_retried_until_success():
+    completions = _FlakyCompletions(failures=2)
+    client = _client_with(completions=completions, max_retries=3, backoff_base=0.01, breaker_failures=5)
+
+    assert client.complete("prompt") == "report"
+    assert len(completions.timeouts) == 3
+    assert (client.calls, client.failures, client.retries) == (3, 2, 2)
+    assert client.breaker.state == "closed"
+
+
+def test_retries_stop_after_max_retries():
+    completions = _FlakyCompletions(failures=10)
+    client = _client_with(completions=completions, max_retries=2, backoff_base=0.01, breaker_failures=5)
+
+    with pytest.raises(groq.APITimeoutError):
+        client.complete("prompt")
+    assert len(completions.timeouts) == 3
+    assert client.retries == 2
+    assert client.breaker.failures == 1  # one call, one breaker failure
+
+
+def test_non_retryable_errors_fail_at_once():
+    def bad_request():
+        response = httpx.Response(400, request=httpx.Request("POST", "https://api.groq.test"))
+        return groq.BadRequestError("bad request", response=response, body=None)
+
+    completions = _FlakyCompletions(failures=10, error=bad_request)
+    client = _client_with(completions=completions, max_retries=3, backoff_base=0.01)
+
+    with pytest.raises(groq.BadRequestError):
+        client.complete("prompt")
+    assert len(completions.timeouts) == 1
+    assert client.retries == 0
+
+
+def test_backoff_is_jittered_and_capped():
+    client = LLMClient("test-key", "test-model", backoff_base=0.5, backoff_max=4.0)
+    for attempt, cap in enumerate([0.5, 1.0, 2.0, 4.0, 4.0, 4.0]):
+        delays = [client._backoff(attempt) for _ in range(500)]
+        assert all(0 <= delay <= cap for delay in delays)
+        assert min(delays) < cap * 0.25 and max(delays) > cap * 0.75  # full jitter, not a fixed step
+
+
+def test_retry_sleeps_use_the_backoff_bounds():
+    completions = _FlakyCompletions(failures=3)
+    client = _client_with(completions=completions, max_retries=3, backoff_base=0.02, backoff_max=0.05)
+    sleeps = []
+
+    def attempt(timeout):
+        return client._call("prompt", 300, timeout)
+
+    assert client._with_retries(attempt, sleeps.append) == "report"
+    assert len(sleeps) == 3
+    assert all(0 <= delay <= cap for delay, cap in zip(sleeps, [0.02, 0.04, 0.05]))
+
+
+def test_overall_deadline_bounds_all_attempts():
+    completions = _FlakyCompletions(failures=100, delay=0.1)
+    client = _client_with(completions=completions, timeout=1.0, deadline=0.45, max_retries=100,
+                          backoff_base=0.01, backoff_max=0.01)
+
+    start = time.monotonic()
+    with pytest.raises(groq.APITimeoutError):
+        client.complete("prompt")
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.45 + 0.15  # at most the attempt that was running at the deadline
+    assert 3 <= len(completions.timeouts) <= 5
+    # Each attempt's timeout is capped by what is left of the deadline
+    assert completions.timeouts[0] <= 0.45
+    assert completions.timeouts == sorted(completions.timeouts, reverse=True)
+
+
+def test_interrupted_half_open_trial_is_abandoned():
+    class Interrupting:
+        def create(self, **kwargs):
+            raise KeyboardInterrupt
+
+    client = _client_with(completions=Interrupting())
+    _open_and_expire(client.breaker)
+
+    with pytest.raises(KeyboardInterrupt):
+        client.complete("prompt")
+    assert client.breaker.state == "half-open"
+    assert client.breaker.allow()  # the trial slot was freed
+
+
+def test_failed_half_open_trial_is_not_abandoned():
+    completions = _FlakyCompletions(failures=10)
+    client = _client_with(completions=completions, max_retries=0)
+    _open_and_expire(client.breaker)
+
+    with pytest.raises(groq.APITimeoutError):
+        client.complete("prompt")
+    assert client.breaker.state == "open"
+    assert not client.breaker.allow()
+
+
+def test_concurrency_is_capped_and_waiting_is_bounded():
+    completions = _FlakyCompletions(failures=0, delay=0.4)
+    client = _client_with(completions=completions, max_concurrency=2, queue_timeout=0.1)
+    results = []
+
+    def call():
+        start = time.monotonic()
+        try:
+            results.append((client.complete("prompt"), time.monotonic() - start))
+        except LLMUnavailable:
+            results.append(("unavailable", time.monotonic() - start))
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert completions.max_active == 2
+    assert sorted(text for text, _ in results) == ["report", "report", "unavailable", "unavailable"]
+    assert all(elapsed < 0.3 for text, elapsed in results if text == "unavailable")
+    assert client.calls == 2
+
+
+def test_async_concurrency_is_capped():
+    class SlowCompletions:
+        def __init__(self):
+            self.active = 0
+            self.max_active = 0
+
+        async def create(self, **kwargs):
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            await asyncio.sleep(0.05)
+            self.active -= 1
+            return _completion("report")
+
+    completions = SlowCompletions()
+    client = _client_with(async_completions=completions, max_concurrency=3, queue_timeout=5)
+
+    async def scenario():
+        return await asyncio.gather(*[client.acomplete("prompt") for _ in range(10)])
+
+    start = time.monotonic()
+    assert asyncio.run(scenario()) == ["report"] * 10
+    assert completions.max_active == 3
+    assert time.monotonic() - start >= 0.05 * 4 - 0.01  # 10 calls through 3 slots: 4 rounds
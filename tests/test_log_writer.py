@@ -0,0 +1,44 @@
+import os
+import time
+
+from src.log_writer import AsyncLogWriter
+
+
+def _writer(path, **kwargs):
+    return AsyncLogWriter(path, flush_interval=0.05, backup_count=20, **kwargs)
+
+
+def test_rotation_splits_batches_at_max_bytes(tmp_path):
+    path = tmp_path / "requests.log"
+    writer = _writer(path, max_bytes=1000, rotate_seconds=0, compress=False)
+    lines = [f'{{"n": {i:04d}, "pad": "{"x" * 80}"}}\n' for i in range(100)]
+    writer._write_batch(lines)
+
+    sizes = [os.path.getsize(p) for p in tmp_path.glob("requests.log*") if not p.name.endswith(".created")]
+    assert writer.written == 100
+    assert writer.rotations > 0
+    assert max(sizes) <= 1000
+    assert sum(sizes) == sum(len(line) for line in lines)
+
+
+def test_age_is_counted_from_file_creation_not_last_write(tmp_path):
+    path = tmp_path / "requests.log"
+    writer = _writer(path, max_bytes=0, rotate_seconds=0.3)
+    writer._write_batch(['{"n": 1}\n'])
+    for n in range(2, 6):
+        time.sleep(0.1)  # every write refreshes the file's mtime
+        writer._write_batch([f'{{"n": {n}}}\n'])
+
+    assert writer.rotations == 1
+    assert path.with_name("requests.log.created").exists()
+
+
+def test_a_second_writer_sees_the_same_start_time(tmp_path):
+    path = tmp_path / "requests.log"
+    first = _writer(path, max_bytes=0, rotate_seconds=0.3)
+    first._write_batch(['{"n": 1}\n'])
+    time.sleep(0.35)
+
+    second = _writer(path, max_bytes=0, rotate_seconds=0.3)
+    second._write_batch(['{"n": 2}\n'])
+    assert second.rotations == 1
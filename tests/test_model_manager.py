@@ -0,0 +1,33 @@
+import os
+
+from src.model_manager import ModelManager
+
+
+class FakePredictor:
+    def __init__(self, path):
+        self.path = path
+        self.version = path.read_text()
+
+    def artifact_paths(self):
+        return [self.path]
+
+    def warm_up(self):
+        pass
+
+    def predict(self, data):
+        return {"model_probability_asd": 0.5, "qchat_risk_level": "Medium"}
+
+
+def test_reload_if_changed_only_reloads_new_artifacts(tmp_path):
+    model = tmp_path / "model.bin"
+    model.write_text("v1")
+    manager = ModelManager(lambda: FakePredictor(model), canary_payload={})
+
+    assert manager.reload_if_changed() is None  # nothing loaded yet
+    assert manager.current().version == "v1"
+    assert manager.reload_if_changed() is None
+
+    model.write_text("v2")
+    os.utime(str(model), ns=(0, model.stat().st_mtime_ns + 1_000_000))
+    assert manager.reload_if_changed() == {"previous_version": "v1", "model_version": "v2"}
+    assert manager.reload_if_changed() is None
@@ -0,0 +1,28 @@
+from src.pdf_generator import render_key
+
+
+def _result(**overrides):
+    result = {
+        "qchat_score": 7,
+        "qchat_risk_level": "High",
+        "model_probability_asd": 0.82,
+        "screening_id": "a" * 32,
+        "model_version": "c48fec6ff032",
+        "disclaimer": "This is a screening tool, not a diagnostic test.",
+    }
+    result.update(overrides)
+    return result
+
+
+def test_identical_documents_share_a_key():
+    key = render_key(_result(), "report")
+    assert render_key(_result(screening_id="b" * 32), "report") == key
+    assert render_key(_result(model_version="0123456789ab", disclaimer="other"), "report") == key
+
+
+def test_rendered_content_changes_the_key():
+    key = render_key(_result(), "report")
+    assert render_key(_result(qchat_score=8), "report") != key
+    assert render_key(_result(qchat_risk_level="Medium"), "report") != key
+    assert render_key(_result(model_probability_asd=0.5), "report") != key
+    assert render_key(_result(), "another report") != key
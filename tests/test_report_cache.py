@@ -0,0 +1,43 @@
+import sqlite3
+
+from src.report_cache import ReportCache
+
+
+def _last_used(cache, key):
+    with sqlite3.connect(str(cache.db_path)) as db:
+        return db.execute("SELECT last_used FROM reports WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hits_do_not_write_until_the_next_put(tmp_path):
+    cache = ReportCache(tmp_path / "reports.db", ttl=100)
+    cache.put("a", "report a")
+    written = _last_used(cache, "a")
+
+    assert cache.get("a") == "report a"
+    assert cache._touched == {}  # used within ttl/10: nothing to refresh
+
+    cache._connection().execute("UPDATE reports SET last_used = last_used - 50 WHERE key = 'a'")
+    cache._connection().commit()
+    assert cache.get("a") == "report a"
+    assert _last_used(cache, "a") == written - 50  # the hit is only remembered
+
+    cache.put("b", "report b")
+    assert _last_used(cache, "a") >= written
+    assert cache._touched == {}
+    assert cache.stats()["hits"] == 2
+
+
+def test_lru_eviction_sees_pending_hits(tmp_path):
+    cache = ReportCache(tmp_path / "reports.db", ttl=0, max_entries=2)
+    cache.put("old", "1")
+    cache.put("new", "2")
+    db = cache._connection()
+    db.execute("UPDATE reports SET last_used = last_used - 7200 WHERE key = 'old'")
+    db.execute("UPDATE reports SET last_used = last_used - 3600.5 WHERE key = 'new'")
+    db.commit()
+
+    assert cache.get("old") == "1"
+    cache.put("third", "3")
+
+    assert cache.get("old") == "1"
+    assert cache.get("new") is None
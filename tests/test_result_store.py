@@ -0,0 +1,77 @@
+import threading
+import time
+
+from src.result_store import ResultStore
+
+
+def _workers(tmp_path, n=2):
+    # One store per worker process: each has its own LRU and SQLite connection
+    return [ResultStore(db_path=tmp_path / "screenings.db") for _ in range(n)]
+
+
+def test_update_keeps_fields_written_by_another_worker(tmp_path):
+    a, b = _workers(tmp_path)
+    screening_id = a.create({"qchat_score": 4})
+    assert b.get(screening_id)["prediction_result"] == {"qchat_score": 4}  # b now caches the bare record
+
+    a.update(screening_id, report="report text")
+    merged = b.update(screening_id, pdf_path="/reports/x.pdf")
+
+    assert merged["report"] == "report text"
+    assert merged["pdf_path"] == "/reports/x.pdf"
+    assert b.get(screening_id)["report"] == "report text"  # LRU refreshed from the merged row
+    assert ResultStore(db_path=tmp_path / "screenings.db").get(screening_id)["pdf_path"] == "/reports/x.pdf"
+
+
+def test_setdefault_keeps_the_first_value_across_workers(tmp_path):
+    a, b = _workers(tmp_path)
+    screening_id = a.create({"qchat_score": 7})
+    b.get(screening_id)
+
+    assert a.setdefault(screening_id, "report", "first") == "first"
+    assert b.setdefault(screening_id, "report", "second") == "first"
+    assert b.get(screening_id)["report"] == "first"
+
+
+def test_concurrent_updates_from_workers_are_all_kept(tmp_path):
+    stores = _workers(tmp_path, 4)
+    screening_id = stores[0].create({"qchat_score": 2})
+    for store in stores:
+        store.get(screening_id)
+
+    def write(i):
+        stores[i % len(stores)].update(screening_id, **{f"field_{i}": i})
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    record = ResultStore(db_path=tmp_path / "screenings.db").get(screening_id)
+    assert all(record[f"field_{i}"] == i for i in range(16))
+
+
+def test_update_of_unknown_or_expired_screening_returns_none(tmp_path):
+    store = ResultStore(ttl=0.01, db_path=tmp_path / "screenings.db")
+    screening_id = store.create({"qchat_score": 1})
+    time.sleep(0.05)
+
+    assert store.update("missing", report="x") is None
+    assert store.update(screening_id, report="x") is None
+    assert ResultStore(ttl=0.01).update("missing", report="x") is None
+
+
+def test_create_purges_expired_screenings_periodically(tmp_path):
+    store = ResultStore(ttl=0.01, db_path=tmp_path / "screenings.db")
+    old = [store.create({"qchat_score": i}) for i in range(3)]
+    time.sleep(0.05)
+
+    store._last_purge -= 60
+    store.create({"qchat_score": 9})
+
+    assert store.stats()["purged"] == 3
+    assert store.stats()["size"] == 1
+    with store._db_lock:
+        rows = store._connection().execute("SELECT id FROM screenings").fetchall()
+    assert len(rows) == 1 and rows[0][0] not in old
@@ -0,0 +1,80 @@
+import os
+import time
+
+from src.artifact_store import ArtifactStore, artifact_name
+from src.retention import STALE_TEMP_AGE, RetentionManager
+
+
+def _report(root, key, size, written, used=None):
+    path = root / key[:2] / artifact_name(key, "pdf")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    os.utime(str(path), (used if used is not None else written, written))
+    return path
+
+
+def test_sweep_removes_reports_past_max_age(tmp_path):
+    now = time.time()
+    old = _report(tmp_path, "a" * 64, 10, written=now - 100, used=now)  # recently used, still too old
+    new = _report(tmp_path, "b" * 64, 10, written=now - 10)
+
+    result = RetentionManager(tmp_path, max_bytes=0, max_age=50).sweep()
+
+    assert result == {"expired": 1, "evicted": 0, "freed_bytes": 10}
+    assert not old.exists()
+    assert new.exists()
+
+
+def test_sweep_evicts_least_recently_used_until_under_max_bytes(tmp_path):
+    now = time.time()
+    lru = _report(tmp_path, "1" * 64, 100, written=now - 30, used=now - 30)
+    reused = _report(tmp_path, "2" * 64, 100, written=now - 40, used=now - 1)  # older, but used just now
+    mid = _report(tmp_path, "3" * 64, 100, written=now - 20, used=now - 20)
+
+    manager = RetentionManager(tmp_path, max_bytes=250, max_age=0)
+    result = manager.sweep()
+
+    assert result["evicted"] == 1
+    assert not lru.exists()
+    assert reused.exists() and mid.exists()
+    assert manager.stats()["bytes_stored"] == 200
+
+
+def test_store_touch_protects_a_report_from_eviction(tmp_path):
+    store = ArtifactStore(tmp_path)
+    now = time.time()
+    first = _report(tmp_path, "c" * 64, 100, written=now - 60, used=now - 60)
+    second = _report(tmp_path, "d" * 64, 100, written=now - 30, used=now - 30)
+
+    assert store.get("c" * 64, "pdf") == first
+    RetentionManager(tmp_path, max_bytes=150, max_age=0).sweep()
+
+    assert first.exists()
+    assert not second.exists()
+
+
+def test_sweep_removes_stale_temp_files_and_ignores_other_files(tmp_path):
+    now = time.time()
+    stale = tmp_path / "ab" / ".tmp-stale.pdf"
+    fresh = tmp_path / "ab" / ".tmp-fresh.pdf"
+    other = tmp_path / "notes.txt"
+    stale.parent.mkdir()
+    for path in (stale, fresh, other):
+        path.write_bytes(b"x" * 1000)
+    os.utime(str(stale), (now - STALE_TEMP_AGE - 1, now - STALE_TEMP_AGE - 1))
+
+    RetentionManager(tmp_path, max_bytes=1, max_age=1).sweep()
+
+    assert not stale.exists()
+    assert fresh.exists() and other.exists()
+
+
+def test_lookup_of_a_swept_report_is_a_miss(tmp_path):
+    store = ArtifactStore(tmp_path)
+    path = store.put(artifact_name("e" * 64, "pdf"), b"%PDF")
+    os.utime(str(path), (time.time() - 100, time.time() - 100))
+
+    RetentionManager(tmp_path, max_bytes=0, max_age=50).sweep()
+
+    assert store.get("e" * 64, "pdf") is None
+    assert store.touch(path) is False
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_thread_calls_share_one_execution():
+    group = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.1)
+        return "report"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(group.do("k", work))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["report"] * 8
+    assert len(calls) == 1
+    assert group.stats()["in_flight"] == 0
+
+
+def test_thread_calls_share_the_exception():
+    group = SingleFlight()
+
+    def work():
+        raise ValueError("upstream down")
+
+    with pytest.raises(ValueError):
+        group.do("k", work)
+    assert group.stats() == {"executions": 1, "shared": 0, "in_flight": 0}
+
+
+def test_async_calls_share_one_execution():
+    group = AsyncSingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "report"
+
+    async def scenario():
+        return await asyncio.gather(*[group.do("k", work) for _ in range(5)])
+
+    assert asyncio.run(scenario()) == ["report"] * 5
+    assert len(calls) == 1
+    assert group.stats() == {"executions": 1, "shared": 4, "in_flight": 0}
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    group = AsyncSingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "report"
+
+    async def scenario():
+        leader = asyncio.ensure_future(group.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()  # first tab of a double click closed
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "report"
+    assert len(calls) == 1
+
+
+def test_async_exception_is_shared_and_key_forgotten():
+    group = AsyncSingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def scenario():
+        results = await asyncio.gather(group.do("k", work), group.do("k", work), return_exceptions=True)
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert group.stats()["in_flight"] == 0